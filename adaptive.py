@@ -0,0 +1,84 @@
+import math
+import os
+
+# Opt-in: pick each question by the current ability estimate and stop once the pass/fail call is confident
+ADAPTIVE_TESTING = os.getenv("ADAPTIVE_TESTING", "0") == "1"
+ADAPTIVE_CONFIDENCE = float(os.getenv("ADAPTIVE_CONFIDENCE", "0.95"))
+ADAPTIVE_MIN_QUESTIONS = int(os.getenv("ADAPTIVE_MIN_QUESTIONS", "5"))
+
+# Three-parameter logistic model: every item shares one discrimination, and a four-option
+# item can be guessed right a quarter of the time
+ITEM_DISCRIMINATION = 1.7
+GUESSING = 0.25
+# Generated questions are rated 1 (easy) to 5 (hard); unrated ones count as medium
+DIFFICULTY_LEVELS = {1: -2.0, 2: -1.0, 3: 0.0, 4: 1.0, 5: 2.0}
+ABILITY_GRID = tuple(-4 + 0.1 * i for i in range(81))
+
+def item_difficulty(question):
+    return DIFFICULTY_LEVELS.get(question.get('difficulty'), 0.0)
+
+def probability_correct(ability, difficulty):
+    return GUESSING + (1 - GUESSING) / (1 + math.exp(-ITEM_DISCRIMINATION * (ability - difficulty)))
+
+def item_information(ability, difficulty):
+    """Fisher information of an item at `ability`; the next question maximises this"""
+    p = probability_correct(ability, difficulty)
+    return ITEM_DISCRIMINATION ** 2 * ((p - GUESSING) / (1 - GUESSING)) ** 2 * (1 - p) / p
+
+def expected_percentage(ability):
+    """Score a candidate of `ability` would expect on medium-difficulty questions"""
+    return 100 * probability_correct(ability, 0.0)
+
+def cutoff_ability(percentage):
+    """Ability whose expected score on medium-difficulty questions is `percentage`"""
+    share = (min(max(percentage / 100, GUESSING + 1e-6), 1 - 1e-6) - GUESSING) / (1 - GUESSING)
+    return math.log(share / (1 - share)) / ITEM_DISCRIMINATION
+
+class AbilityEstimate:
+    """Posterior over candidate ability on ABILITY_GRID, starting from a standard normal prior"""
+
+    __slots__ = ("log_weights",)
+
+    def __init__(self):
+        self.log_weights = [-ability * ability / 2 for ability in ABILITY_GRID]
+
+    @classmethod
+    def from_responses(cls, responses):
+        """Build the posterior from (difficulty, correct) pairs"""
+        estimate = cls()
+        for difficulty, correct in responses:
+            estimate.update(difficulty, correct)
+        return estimate
+
+    def update(self, difficulty, correct):
+        for i, ability in enumerate(ABILITY_GRID):
+            p = probability_correct(ability, difficulty)
+            self.log_weights[i] += math.log(p if correct else 1 - p)
+
+    def weights(self):
+        top = max(self.log_weights)
+        weights = [math.exp(w - top) for w in self.log_weights]
+        total = sum(weights)
+        return [w / total for w in weights]
+
+    def mean(self):
+        return sum(ability * w for ability, w in zip(ABILITY_GRID, self.weights()))
+
+    def probability_above(self, ability):
+        return sum(w for grid_ability, w in zip(ABILITY_GRID, self.weights()) if grid_ability >= ability)
+
+def select_item(difficulties, ability):
+    """Index of the most informative item at `ability`; ties go to the earliest"""
+    best, best_information = None, -1.0
+    for index, difficulty in enumerate(difficulties):
+        information = item_information(ability, difficulty)
+        if information > best_information:
+            best, best_information = index, information
+    return best
+
+def decision_reached(estimate, cutoff, asked, confidence=ADAPTIVE_CONFIDENCE, min_questions=ADAPTIVE_MIN_QUESTIONS):
+    """Whether the pass/fail call at `cutoff` ability is at least `confidence` certain either way"""
+    if asked < min_questions:
+        return False
+    above = estimate.probability_above(cutoff)
+    return above >= confidence or above <= 1 - confidence
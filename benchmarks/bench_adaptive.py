@@ -0,0 +1,100 @@
+"""Simulation benchmark for adaptive assessments.
+
+Simulated candidates with abilities drawn from a standard normal take the
+assessment through ConversationEngine twice, once fixed-length and once
+adaptive, answering each question correctly with the probability the item
+response model gives for their ability and the question's difficulty. Questions
+come from the offline stub backend.
+
+Reported per mode: questions asked and how often the pass/fail decision matches
+the candidate's true ability. A fixed test truncated to the adaptive mean length
+is shown as well, to separate the gain of choosing questions from asking fewer.
+
+Usage:
+    python benchmarks/bench_adaptive.py [--candidates 500] [--seed 7]
+
+Exits non-zero if adaptive tests are not shorter than fixed ones, or if their
+decision accuracy is more than --max-accuracy-drop below the fixed test's.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+INTAKE = ["hi", "Jane Doe", "jane@example.com", "+1 555 123 4567", "5", "Berlin", "Python Developer", "yes"]
+
+def take_assessment(engine, ability, rng):
+    """Run one candidate through the engine; returns the list of (correct) answers given"""
+    from adaptive import item_difficulty, probability_correct
+    for message in INTAKE:
+        engine.step(message)
+    while not engine.assessment_complete:
+        question = engine.question(engine.current_question_index)
+        key = question['correct_answer']
+        if rng.random() < probability_correct(ability, item_difficulty(question)):
+            answer = key
+        else:
+            answer = rng.choice([letter for letter in "ABCD" if letter != key])
+        engine.step(answer)
+    return [correct for _, _, correct in engine.user_answers]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare adaptive and fixed-length assessments on simulated candidates.")
+    parser.add_argument("--candidates", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--max-accuracy-drop", type=float, default=0.03)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update(LLM_BACKEND="stub", CANDIDATE_DB="", QUESTION_BANK_DB=os.path.join(tmp, "questions.db"))
+        from adaptive import cutoff_ability
+        from engine import PASS_PERCENTAGE, ConversationEngine
+
+        rng = random.Random(args.seed)
+        cutoff = cutoff_ability(PASS_PERCENTAGE)
+        fixed_lengths, adaptive_lengths = [], []
+        fixed_right = adaptive_right = 0
+        fixed_answers, truths = [], []
+        for _ in range(args.candidates):
+            ability = rng.gauss(0, 1)
+            truth = ability >= cutoff
+
+            engine = ConversationEngine(adaptive=False)
+            answers = take_assessment(engine, ability, rng)
+            fixed_lengths.append(len(answers))
+            fixed_right += (engine.final_percentage >= PASS_PERCENTAGE) == truth
+            fixed_answers.append(answers)
+            truths.append(truth)
+
+            engine = ConversationEngine(adaptive=True)
+            adaptive_lengths.append(len(take_assessment(engine, ability, rng)))
+            adaptive_right += (engine.final_percentage >= PASS_PERCENTAGE) == truth
+
+    # The same candidates' fixed tests cut off after as many questions as adaptive ones ask on average
+    short_length = max(1, round(statistics.mean(adaptive_lengths)))
+    short_right = sum((100 * sum(answers[:short_length]) / short_length >= PASS_PERCENTAGE) == truth
+                      for answers, truth in zip(fixed_answers, truths))
+
+    count = args.candidates
+    fixed_accuracy = fixed_right / count
+    adaptive_accuracy = adaptive_right / count
+    print(f"candidates: {count}, cutoff {PASS_PERCENTAGE:g}% (ability {cutoff:+.2f})")
+    print(f"fixed:          {statistics.mean(fixed_lengths):5.1f} questions  accuracy {fixed_accuracy:.1%}")
+    print(f"fixed, first {short_length:2d}: {short_length:5.1f} questions  accuracy {short_right / count:.1%}")
+    print(f"adaptive:       {statistics.mean(adaptive_lengths):5.1f} questions  accuracy {adaptive_accuracy:.1%}  "
+          f"(median {statistics.median(adaptive_lengths):g}, max {max(adaptive_lengths)})")
+
+    if statistics.mean(adaptive_lengths) >= statistics.mean(fixed_lengths):
+        print("FAIL: adaptive tests are not shorter than fixed-length ones")
+        return 1
+    if adaptive_accuracy < fixed_accuracy - args.max_accuracy_drop:
+        print(f"FAIL: adaptive accuracy is more than {args.max_accuracy_drop:.0%} below the fixed test's")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
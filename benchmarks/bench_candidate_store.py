@@ -0,0 +1,86 @@
+"""Throughput benchmark for the write-behind candidate store.
+
+Submits completed-assessment records from several threads, as concurrent chat
+sessions would, and reports how long submit() blocks a turn and how fast the
+writer thread commits.
+
+Usage:
+    python benchmarks/bench_candidate_store.py [--records 20000] [--threads 8]
+
+Exits non-zero if the store commits fewer than --min-per-minute records per minute.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from candidate_store import CandidateStore
+
+def make_record(i):
+    return {
+        "session_id": uuid.uuid4().hex,
+        "status": "completed",
+        "name": f"Candidate {i}",
+        "email": f"candidate{i}@example.com",
+        "phone": "+1 555 123 4567",
+        "experience": "5",
+        "location": "Berlin",
+        "position": "Python Developer",
+        "score": 73.3,
+        "answers": [{"question": f"Question {q}?", "user_answer": "A", "correct_answer": "B", "correct": False}
+                    for q in range(15)],
+        "completed_at": time.time(),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure candidate store submit latency and write throughput.")
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--min-per-minute", type=float, default=5000)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = CandidateStore(os.path.join(tmp, "candidates.db"))
+        per_thread = args.records // args.threads
+        latencies = []
+        lock = threading.Lock()
+
+        def submitter(offset):
+            local = []
+            for i in range(per_thread):
+                record = make_record(offset + i)
+                start = time.perf_counter()
+                store.submit(record)
+                local.append(time.perf_counter() - start)
+            with lock:
+                latencies.extend(local)
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=submitter, args=(t * per_thread,)) for t in range(args.threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        store.flush()
+        elapsed = time.perf_counter() - start
+        stats = store.stats()
+        store.close()
+
+    latencies.sort()
+    per_minute = stats["written"] / elapsed * 60
+    print(f"records   {stats['written']} written, {stats['dropped']} dropped in {stats['batches']} batches")
+    print(f"submit    p50 {latencies[len(latencies) // 2] * 1e6:.1f} us, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1e6:.1f} us, max {latencies[-1] * 1e3:.2f} ms")
+    print(f"commits   {per_minute:,.0f} records/minute ({elapsed:.2f}s total)")
+    if per_minute < args.min_per_minute or stats["dropped"]:
+        print(f"FAIL: below {args.min_per_minute:,.0f} records/minute or records dropped")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
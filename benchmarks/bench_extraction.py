@@ -0,0 +1,95 @@
+"""Adversarial micro-benchmark for the entity scanner in extraction.py.
+
+Feeds hostile messages of doubling length to scan_message (with the length cap
+disabled) and checks that time per character stays flat, i.e. that worst-case
+cost is linear in input length. The pre-extraction.py regexes are timed on the
+same inputs for comparison.
+
+Usage:
+    python benchmarks/bench_extraction.py [--max-length 64000]
+
+Exits non-zero if scan time grows faster than linearly.
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extraction import scan_message
+
+LEGACY_PATTERNS = {
+    "name_suffix": re.compile(r"([a-zA-Z\s]+) (?:here|speaking)"),
+    "email": re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'),
+    "phone": re.compile(r'(?:\+\d{1,3})?[\s\-\.]?\(?\d{1,4}\)?[\s\-\.]*\d{1,4}[\s\-\.]*\d{1,9}'),
+}
+LEGACY_MAX_LENGTH = 8000
+# Allowed growth of time-per-character from the smallest to the largest input
+LINEARITY_TOLERANCE = 3.0
+
+def adversarial_inputs(length, rng):
+    """Yield (label, message) pairs designed to trigger regex backtracking"""
+    yield "letters", "a" * length
+    yield "letters_no_at", "a" * (length - 1) + "!"
+    yield "dotted_local", "a." * (length // 2)
+    yield "spaced_letters", "a " * (length // 2) + "1"
+    yield "digit_runs", "1-" * (length // 2)
+    yield "digit_spaces", "1 " * (length // 2) + "x"
+    yield "separators", "1" + "-" * (length - 2) + "x"
+    yield "many_ats", "a@" * (length // 2)
+    yield "domain_dots", "a@" + "b." * (length // 2)
+    yield "random_ascii", "".join(rng.choice("a1@.- +()") for _ in range(length))
+
+def time_call(function, text, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def legacy_scan(text):
+    lowered = text.lower()
+    for pattern in LEGACY_PATTERNS.values():
+        pattern.search(lowered)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check that scan_message stays linear on hostile input.")
+    parser.add_argument("--max-length", type=int, default=64000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    lengths = []
+    length = 1000
+    while length <= args.max_length:
+        lengths.append(length)
+        length *= 2
+
+    per_char = {}
+    print(f"{'input':16} {'length':>8} {'scan us':>10} {'ns/char':>8} {'legacy us':>11}")
+    for length in lengths:
+        rng = random.Random(args.seed)
+        for label, text in adversarial_inputs(length, rng):
+            elapsed = time_call(lambda t: scan_message(t, max_length=None), text)
+            per_char.setdefault(label, []).append(elapsed / len(text))
+            legacy = ""
+            if length <= LEGACY_MAX_LENGTH:
+                legacy = f"{time_call(legacy_scan, text, repeat=1) * 1e6:11.0f}"
+            print(f"{label:16} {len(text):8} {elapsed * 1e6:10.0f} {elapsed / len(text) * 1e9:8.0f} {legacy:>11}")
+
+    failures = []
+    for label, costs in per_char.items():
+        growth = costs[-1] / costs[0]
+        if growth > LINEARITY_TOLERANCE:
+            failures.append(f"{label}: time per character grew {growth:.1f}x")
+    if failures:
+        print("Super-linear inputs:\n  " + "\n  ".join(failures))
+        return 1
+    print(f"OK: time per character stayed within {LINEARITY_TOLERANCE}x across {lengths[0]}-{lengths[-1]} chars")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
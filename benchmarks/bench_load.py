@@ -0,0 +1,276 @@
+"""Concurrent-session load test for one app replica, fully offline.
+
+Drives --sessions scripted candidates, --concurrency at a time, from "hi" through
+intake, consent and every MCQ answer to "exit". Questions come from the stub LLM
+backend with --llm-latency seconds per call, so nothing touches the network.
+
+Drivers:
+    engine   sessions run on threads of this process, like one replica; each turn does
+             what app.py does per message: ConversationEngine.step() then a session
+             store save (or delete once the conversation ends)
+    apptest  each candidate is a Streamlit AppTest session, so every turn is a full
+             script rerun including rendering; closer to the real app, but sessions
+             run in --concurrency worker processes as AppTest cannot share one
+
+Reports throughput, p50/p95/p99 turn latency (overall and for the consent turn,
+which waits on question generation) and resident memory growth per live session.
+
+Usage:
+    python benchmarks/bench_load.py [--driver engine] [--sessions 200] [--concurrency 50]
+        [--llm-latency 1.0] [--think 0] [--no-bank] [--max-p99 SECONDS]
+
+Exits non-zero if any session fails, or if the overall p99 exceeds --max-p99.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+MAX_TURNS = 60
+
+def rss_bytes():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * PAGE_SIZE
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+FIRST_NAMES = ("Jane", "Arjun", "Maria", "Kenji", "Amara", "Lucas", "Priya", "Omar", "Elena", "Tomas")
+LAST_NAMES = ("Doe", "Sharma", "Garcia", "Tanaka", "Okafor", "Silva", "Iyer", "Haddad", "Novak", "Berg")
+
+def intake_messages(number, position):
+    name = f"{FIRST_NAMES[number % 10]} {LAST_NAMES[number // 10 % 10]}"
+    return ["hi", name, f"candidate{number}@example.com", f"+1 555 01{number % 100:02d} 000",
+            str(number % 15), "Berlin", position, "yes"]
+
+class LoadRecorder:
+    """Turn latencies and live-session accounting shared by the driver threads"""
+
+    def __init__(self):
+        self.turns = []
+        self.consent_turns = []
+        self.errors = []
+        self.completed = 0
+        self.live = 0
+        self.peak_live = 0
+        self.peak_rss = 0
+        self._lock = threading.Lock()
+
+    def turn(self, seconds, consent=False):
+        with self._lock:
+            self.turns.append(seconds)
+            if consent:
+                self.consent_turns.append(seconds)
+
+    def session_started(self):
+        with self._lock:
+            self.live += 1
+            self.peak_live = max(self.peak_live, self.live)
+
+    def session_finished(self, error=None):
+        with self._lock:
+            self.live -= 1
+            if error is None:
+                self.completed += 1
+            else:
+                self.errors.append(error)
+
+    def sample_memory(self, stop, interval=0.05):
+        while not stop.wait(interval):
+            rss = rss_bytes()
+            with self._lock:
+                self.peak_rss = max(self.peak_rss, rss)
+
+def run_engine_session(number, position, think, recorder):
+    from engine import ConversationEngine
+    from session_store import get_session_store
+
+    store = get_session_store()
+    engine = ConversationEngine()
+    rng = random.Random(number)
+
+    def turn(message, consent=False):
+        start = time.perf_counter()
+        engine.step(message)
+        if engine.ended:
+            store.delete(engine.session_id)
+        else:
+            store.save(engine)
+        recorder.turn(time.perf_counter() - start, consent)
+        if think:
+            time.sleep(rng.uniform(0, 2 * think))
+
+    run_script(number, position, turn, lambda: engine)
+
+def run_apptest_session(number, position, think, recorder, timeout):
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=timeout)
+    app.run()
+    rng = random.Random(number)
+
+    def turn(message, consent=False):
+        start = time.perf_counter()
+        app.chat_input[0].set_value(message).run()
+        recorder.turn(time.perf_counter() - start, consent)
+        if app.exception:
+            raise RuntimeError(f"session {number}: {app.exception[0].message}")
+        if think:
+            time.sleep(rng.uniform(0, 2 * think))
+
+    # The engine object outlives the rerun that replaces it after "exit", so it is captured before then
+    engine = []
+    run_script(number, position, turn, lambda: engine[0] if engine else engine.append(app.session_state["engine"]) or engine[0])
+
+def run_script(number, position, turn, current_engine):
+    """Send one candidate's messages from "hi" to "exit" through `turn`"""
+    rng = random.Random(-number - 1)
+    script = intake_messages(number, position)
+    for index, message in enumerate(script):
+        turn(message, consent=index == len(script) - 1)
+    engine = current_engine()
+    for _ in range(MAX_TURNS):
+        if engine.assessment_complete:
+            break
+        turn(rng.choice("ABCD"))
+    if not engine.assessment_complete:
+        raise RuntimeError(f"session {number} did not finish its assessment")
+    turn("exit")
+    if not engine.ended:
+        raise RuntimeError(f"session {number} did not end on exit")
+
+_worker_warm = False
+
+def init_apptest_worker(llm_latency):
+    from prompts import StubBackend, configure_llm_client
+    configure_llm_client(StubBackend(latency=llm_latency))
+
+def apptest_worker_session(number, position, think, timeout):
+    """Run one AppTest session in a worker process; returns (turns, consent turns, RSS growth, error)
+
+    AppTest sessions share Streamlit's process-wide runtime, so concurrent ones need
+    their own processes. A worker's first session loads the app and is not counted
+    towards memory growth.
+    """
+    global _worker_warm
+    recorder = LoadRecorder()
+    start_rss = rss_bytes()
+    error = None
+    try:
+        run_apptest_session(number, position, think, recorder, timeout)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    growth = rss_bytes() - start_rss if _worker_warm else None
+    _worker_warm = True
+    return recorder.turns, recorder.consent_turns, growth, error
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test one replica with concurrent scripted candidates.")
+    parser.add_argument("--driver", choices=("engine", "apptest"), default="engine")
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--llm-latency", type=float, default=1.0, help="stub LLM seconds per call")
+    parser.add_argument("--think", type=float, default=0.0, help="mean candidate think time between turns, seconds")
+    parser.add_argument("--no-bank", action="store_true", help="generate questions for every session instead of "
+                                                               "serving roles from the question bank once it is full")
+    parser.add_argument("--max-p99", type=float, help="fail if the overall p99 turn latency exceeds this, seconds")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Everything in-process or under tmp: no network, no databases left behind
+        os.environ.update(LLM_BACKEND="stub", CANDIDATE_DB="", QUESTION_BANK_DB="", QUESTION_PACK="",
+                          SESSION_DB=os.path.join(tmp, "sessions.db"))
+        if args.no_bank:
+            os.environ.update(QUESTION_BANK_TARGET=str(10 ** 9), QUESTION_BANK_PATIENCE=str(10 ** 9))
+        from positions import ROLE_TAXONOMY
+
+        roles = list(ROLE_TAXONOMY)
+        recorder = LoadRecorder()
+        session_growth = []
+        llm_calls = None
+        start_rss = rss_bytes()
+        recorder.peak_rss = start_rss
+        stop = threading.Event()
+        sampler = threading.Thread(target=recorder.sample_memory, args=(stop,), daemon=True)
+        sampler.start()
+        start = time.perf_counter()
+
+        if args.driver == "engine":
+            from prompts import StubBackend, configure_llm_client
+            client = configure_llm_client(StubBackend(latency=args.llm_latency))
+
+            def session(number):
+                recorder.session_started()
+                try:
+                    run_engine_session(number, roles[number % len(roles)], args.think, recorder)
+                except Exception as e:
+                    recorder.session_finished(f"{type(e).__name__}: {e}")
+                else:
+                    recorder.session_finished()
+
+            with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+                list(executor.map(session, range(args.sessions)))
+            llm_calls = client.stats()["calls"]
+        else:
+            # Workers get these functions by module name: AppTest swaps out __main__ while the app script runs
+            import bench_load
+            context = multiprocessing.get_context("spawn")
+            timeout = args.llm_latency * 4 + 30
+            with ProcessPoolExecutor(max_workers=args.concurrency, mp_context=context,
+                                     initializer=bench_load.init_apptest_worker, initargs=(args.llm_latency,)) as executor:
+                futures = [executor.submit(bench_load.apptest_worker_session, number, roles[number % len(roles)], args.think, timeout)
+                           for number in range(args.sessions)]
+                for future in futures:
+                    turns, consent_turns, growth, error = future.result()
+                    recorder.turns.extend(turns)
+                    recorder.consent_turns.extend(consent_turns)
+                    if growth is not None:
+                        session_growth.append(growth)
+                    if error is None:
+                        recorder.completed += 1
+                    else:
+                        recorder.errors.append(error)
+
+        elapsed = time.perf_counter() - start
+        stop.set()
+        sampler.join()
+        end_rss = rss_bytes()
+
+    turns = recorder.turns
+    print(f"driver {args.driver}: {args.sessions} sessions, {args.concurrency} concurrent, "
+          f"stub LLM {args.llm_latency:g}s/call" + (f" ({llm_calls} calls)" if llm_calls is not None else ""))
+    print(f"throughput: {len(turns) / elapsed:.1f} turns/s, {recorder.completed / elapsed * 60:.1f} sessions/min "
+          f"({elapsed:.1f}s total)")
+    for label, values in (("all turns", turns), ("consent turn", recorder.consent_turns)):
+        if values:
+            print(f"{label:>12}: p50 {percentile(values, 0.5) * 1000:8.1f} ms  p95 {percentile(values, 0.95) * 1000:8.1f} ms  "
+                  f"p99 {percentile(values, 0.99) * 1000:8.1f} ms  mean {statistics.mean(values) * 1000:8.1f} ms")
+    if args.driver == "engine":
+        print(f"memory: RSS {start_rss / 2**20:.1f} -> peak {recorder.peak_rss / 2**20:.1f} -> end {end_rss / 2**20:.1f} MiB; "
+              f"{(recorder.peak_rss - start_rss) / max(1, recorder.peak_live) / 1024:.1f} KiB per live session "
+              f"at peak ({recorder.peak_live} live)")
+    elif session_growth:
+        print(f"memory: {statistics.mean(session_growth) / 1024:.1f} KiB RSS growth per session in warm worker processes")
+
+    failed = False
+    if recorder.errors:
+        print(f"FAIL: {len(recorder.errors)} sessions failed, e.g. {recorder.errors[0]}")
+        failed = True
+    if args.max_p99 is not None and percentile(turns, 0.99) > args.max_p99:
+        print(f"FAIL: p99 turn latency {percentile(turns, 0.99):.3f}s exceeds {args.max_p99:g}s")
+        failed = True
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
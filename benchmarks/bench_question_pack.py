@@ -0,0 +1,95 @@
+"""Benchmark for memory-mapped question packs.
+
+Writes a synthetic pack with --roles roles of --questions questions each, then
+measures how long opening it takes, how much Python heap that costs (the mapped
+pages belong to the shared page cache, not the process), and how fast a session's
+draw of 15 questions is looked up and decoded. The same banks held as dicts are
+measured for comparison.
+
+Usage:
+    python benchmarks/bench_question_pack.py [--roles 5000] [--questions 60] [--draws 20000]
+
+Exits non-zero if opening the pack allocates more than --max-open-kib of heap or a
+draw takes longer than --max-draw-us microseconds on average.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from question_pack import QuestionPack, write_pack
+
+def make_banks(roles, questions):
+    return {
+        f"Role {r}": [
+            {
+                "question": f"For role {r}, question {q}: which approach best handles case {r * 31 + q}?",
+                "options": [f"Approach {letter} for case {r * 31 + q}" for letter in "ABCD"],
+                "correct_answer": "ABCD"[(r + q) % 4],
+                "difficulty": q % 5 + 1,
+            }
+            for q in range(questions)
+        ]
+        for r in range(roles)
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure question pack size, open cost and draw latency.")
+    parser.add_argument("--roles", type=int, default=5000)
+    parser.add_argument("--questions", type=int, default=60)
+    parser.add_argument("--draws", type=int, default=20000)
+    parser.add_argument("--max-open-kib", type=float, default=64)
+    parser.add_argument("--max-draw-us", type=float, default=200)
+    args = parser.parse_args(argv)
+
+    banks = make_banks(args.roles, args.questions)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "question_pack.bin")
+        start = time.perf_counter()
+        write_pack(banks, path)
+        write_seconds = time.perf_counter() - start
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        pack = QuestionPack(path)
+        open_seconds = time.perf_counter() - start
+        open_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        rng = random.Random(1)
+        positions = [f"Role {rng.randrange(args.roles)}" for _ in range(args.draws)]
+        start = time.perf_counter()
+        for position in positions:
+            questions = [pack.question(question_id) for question_id in pack.draw(position, 15)]
+            assert len(questions) == min(15, args.questions)
+        draw_us = (time.perf_counter() - start) / args.draws * 1e6
+        pack.close()
+        size = os.path.getsize(path)
+
+    tracemalloc.start()
+    dict_banks = make_banks(args.roles, args.questions)
+    dict_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del dict_banks
+
+    print(f"pack: {args.roles} roles x {args.questions} questions, {size / 2**20:.1f} MiB, written in {write_seconds:.2f}s")
+    print(f"open: {open_seconds * 1000:.2f} ms, {open_bytes / 1024:.1f} KiB heap "
+          f"(same banks as dicts: {dict_bytes / 2**20:.1f} MiB per process)")
+    print(f"draw: {draw_us:.1f} us per session (role lookup + 15 questions decoded)")
+
+    failed = False
+    if open_bytes / 1024 > args.max_open_kib:
+        print(f"FAIL: opening the pack allocated {open_bytes / 1024:.1f} KiB, budget {args.max_open_kib:g} KiB")
+        failed = True
+    if draw_us > args.max_draw_us:
+        print(f"FAIL: draws took {draw_us:.1f} us, budget {args.max_draw_us:g} us")
+        failed = True
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""Cold start benchmark for the Streamlit app.
+
+Each run starts a fresh interpreter, so nothing is cached between runs. Two
+numbers are measured:
+
+- import: wall time of `import app`, the module graph every worker loads
+- first paint: wall time of the first script run under Streamlit's AppTest,
+  i.e. what a new session waits for before the page appears
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5] [--import-budget 1.0] [--first-paint-budget 1.5]
+
+With --import-time the slowest modules reported by `python -X importtime` are
+listed too. Exits non-zero if the median of either measurement exceeds its budget.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SCRIPT = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+import app
+print(json.dumps({{"seconds": time.perf_counter() - start}}))
+"""
+
+FIRST_PAINT_SCRIPT = """
+import json, os, sys, time, warnings
+warnings.filterwarnings("ignore")
+os.chdir({root!r})
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file("app.py", default_timeout=60)
+start = time.perf_counter()
+at.run()
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "exception": bool(at.exception), "elements": len(at.markdown)}}))
+"""
+
+def run_child(script, env):
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, env=env, cwd=ROOT)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "child failed")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def slowest_imports(env, limit):
+    """Return (cumulative seconds, module) for the slowest imports under `import app`"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"],
+                            capture_output=True, text=True, env=env, cwd=ROOT)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative) / 1e6, name.rstrip()))
+    return sorted(rows, reverse=True)[:limit]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure app import and first-paint time in fresh processes.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget", type=float, default=1.0, help="median seconds allowed for `import app`")
+    parser.add_argument("--first-paint-budget", type=float, default=1.5, help="median seconds allowed for the first script run")
+    parser.add_argument("--import-time", type=int, default=0, metavar="N", help="also list the N slowest imports")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Offline and side-effect free: no LLM calls, no databases left in the checkout
+        env = dict(os.environ, LLM_BACKEND="stub", CANDIDATE_DB="", SESSION_BACKEND="memory",
+                   QUESTION_BANK_DB=os.path.join(tmp, "questions.db"), METRICS_ENABLED="0", PROFILE_MODE="off")
+
+        imports, paints = [], []
+        for _ in range(args.runs):
+            imports.append(run_child(IMPORT_SCRIPT.format(root=ROOT), env)["seconds"])
+            paint = run_child(FIRST_PAINT_SCRIPT.format(root=ROOT), env)
+            if paint["exception"]:
+                print("first script run raised an exception")
+                return 1
+            paints.append(paint["seconds"])
+
+        import_median = statistics.median(imports)
+        paint_median = statistics.median(paints)
+        print(f"import app:  median {import_median * 1000:7.1f} ms  max {max(imports) * 1000:7.1f} ms  "
+              f"(budget {args.import_budget * 1000:.0f} ms)")
+        print(f"first paint: median {paint_median * 1000:7.1f} ms  max {max(paints) * 1000:7.1f} ms  "
+              f"(budget {args.first_paint_budget * 1000:.0f} ms)")
+
+        if args.import_time:
+            print("slowest imports (cumulative):")
+            for seconds, name in slowest_imports(env, args.import_time):
+                print(f"  {seconds * 1000:8.1f} ms  {name}")
+
+    failed = False
+    if import_median > args.import_budget:
+        print(f"FAIL: import took {import_median:.2f}s, budget {args.import_budget:.2f}s")
+        failed = True
+    if paint_median > args.first_paint_budget:
+        print(f"FAIL: first paint took {paint_median:.2f}s, budget {args.first_paint_budget:.2f}s")
+        failed = True
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
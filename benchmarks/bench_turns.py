@@ -0,0 +1,292 @@
+"""Deterministic per-turn micro-benchmarks replayed from recorded fixtures.
+
+fixtures/transcripts.json holds anonymized candidate transcripts, each naming the
+recorded LLM question output (in fixtures/llm_outputs/) that its position got. The
+.txt outputs are text-format responses, including formats parse_mcqs only half
+handles: preambles and CRLF line endings, markdown bold, lowercase or parenthesized
+option letters, answer lines, and questions with too few or too many options. The
+.json outputs are schema-constrained responses for the default structured path,
+one of them with items that fail validation and so also take the repair call.
+
+Measured, as time per call (best of --repeat passes, with garbage collection
+paused) and peak traced allocation per call:
+    parse_mcqs            each recorded text output
+    parse_structured_mcqs each recorded JSON output
+    iter_json_items       each recorded JSON output, fed in streamed chunks
+    extract_*             every candidate message in the transcripts
+    generate_response     every transcript replayed turn by turn on a fresh
+                          ConversationEngine, grouped by conversation stage;
+                          "/json" stages replayed the JSON outputs with
+                          STRUCTURED_QUESTIONS on
+
+Replays are seeded and the recorded output is served by an in-process backend;
+the wait for question generation after the last intake turn is not timed, as a
+candidate reading the consent prompt would cover it. Each run is saved as JSON,
+including a digest of every reply, so later runs can be compared against it.
+
+Usage:
+    python benchmarks/bench_turns.py [--repeat 7] [--number 200] [--save PATH]
+        [--baseline PATH] [--max-regression 0.25]
+
+Exits non-zero if replaying the fixtures twice gives different replies, or if a
+function is more than --max-regression slower or allocates that much more than
+in --baseline.
+"""
+import argparse
+import gc
+import hashlib
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+FIXTURES_DIR = os.path.join(ROOT, "benchmarks", "fixtures")
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+EXTRACTORS = ("name", "email", "phone", "experience", "confirmation", "mcq_answer")
+SEED = 20240601
+JOB_TIMEOUT = 10
+CHUNK_SIZE = 64
+
+def load_fixtures():
+    with open(os.path.join(FIXTURES_DIR, "transcripts.json")) as f:
+        transcripts = json.load(f)
+    outputs = {}
+    for name in sorted(os.listdir(os.path.join(FIXTURES_DIR, "llm_outputs"))):
+        # newline="" keeps recorded CRLF line endings as they came from the model
+        with open(os.path.join(FIXTURES_DIR, "llm_outputs", name), newline="") as f:
+            outputs[name] = f.read()
+    return transcripts, outputs
+
+def fixtures_digest(transcripts, outputs):
+    return hashlib.sha256(json.dumps([transcripts, outputs], sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+def is_structured(output_name):
+    return output_name.endswith(".json")
+
+def chunked(text):
+    return [text[i:i + CHUNK_SIZE] for i in range(0, len(text), CHUNK_SIZE)]
+
+def make_replay_backend(text):
+    from prompts import LLMBackend
+
+    class ReplayBackend(LLMBackend):
+        """Serves one recorded response for every prompt"""
+
+        def generate(self, prompt, timeout, response_schema=None):
+            return text
+
+        def stream(self, prompt, timeout, response_schema=None):
+            yield from chunked(text)
+
+    return ReplayBackend()
+
+def replay(transcripts, outputs, measure):
+    """Replay every transcript through fresh engines, calling measure(call) for each turn
+
+    Returns {stage: [measure results]} and a digest of the replies.
+    """
+    import questions
+    from engine import ConversationEngine
+    from prompts import configure_llm_client
+    from question_bank import get_question_bank
+
+    by_stage = {}
+    digest = hashlib.sha256()
+    for transcript in transcripts:
+        configure_llm_client(make_replay_backend(outputs[transcript["llm_output"]]), hedge_after=0)
+        structured = is_structured(transcript["llm_output"])
+        questions.STRUCTURED_QUESTIONS = structured
+        # Every replay generates its questions rather than drawing them from earlier replays
+        get_question_bank().clear()
+        random.seed(SEED)
+        engine = ConversationEngine(adaptive=False)
+        for message in transcript["turns"]:
+            stage = engine.stage() + ("/json" if structured else "")
+            reply = []
+            by_stage.setdefault(stage, []).append(measure(lambda: reply.append(engine.generate_response(message))))
+            text = reply[0] if isinstance(reply[0], str) else engine.message_text(reply[0])
+            digest.update(text.encode("utf-8") + b"\0")
+            if engine.question_job is not None:
+                engine.question_job.wait_for(sys.maxsize, JOB_TIMEOUT)
+    return by_stage, digest.hexdigest()[:16]
+
+@contextmanager
+def gc_paused():
+    """Keep collections out of timed passes, as timeit does"""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+def timed_call(call):
+    start = time.perf_counter()
+    call()
+    return time.perf_counter() - start
+
+def traced_peak(call):
+    """Peak bytes traced while `call` runs, above what was allocated before it"""
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    call()
+    return tracemalloc.get_traced_memory()[1] - before
+
+def micro_cases(transcripts, outputs):
+    """(name, [zero-argument calls]) for the parse, iter_json_items and extract_* cases"""
+    import extraction
+    from prompts import iter_json_items, parse_structured_mcqs
+    from questions import parse_mcqs
+
+    cases = []
+    for name, text in outputs.items():
+        label = os.path.splitext(name)[0]
+        if is_structured(name):
+            chunks = chunked(text)
+            cases.append((f"parse_structured_mcqs[{label}]", [lambda text=text: parse_structured_mcqs(text)]))
+            cases.append((f"iter_json_items[{label}]", [lambda chunks=chunks: list(iter_json_items(chunks))]))
+        else:
+            cases.append((f"parse_mcqs[{label}]", [lambda text=text: parse_mcqs(text)]))
+    messages = [message for transcript in transcripts for message in transcript["turns"]]
+    for field in EXTRACTORS:
+        function = getattr(extraction, f"extract_{field}")
+        cases.append((f"extract_{field}", [lambda message=message, function=function: function(message)
+                                           for message in messages]))
+    return cases
+
+def measure_micro(calls, repeat, number):
+    best = float("inf")
+    with gc_paused():
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                for call in calls:
+                    call()
+            best = min(best, (time.perf_counter() - start) / (number * len(calls)))
+    tracemalloc.start()
+    peaks = [traced_peak(call) for call in calls]
+    tracemalloc.stop()
+    return {"calls": len(calls), "us_per_call": best * 1e6, "peak_kib_per_call": sum(peaks) / len(peaks) / 1024}
+
+def measure_turns(transcripts, outputs, repeat):
+    """generate_response results per stage, plus the replies digest
+
+    Each turn's time is its best over `repeat` replays; turns replay in the same order
+    every time, so they line up by position.
+    """
+    # One untimed replay loads the role index, numpy and the rest of the lazily imported path
+    _, digest = replay(transcripts, outputs, lambda call: call())
+    best = {}
+    for _ in range(repeat):
+        with gc_paused():
+            by_stage, replayed = replay(transcripts, outputs, timed_call)
+        if replayed != digest:
+            raise RuntimeError("replaying the fixtures gave different replies; the replay is not deterministic")
+        for stage, seconds in by_stage.items():
+            best[stage] = [min(pair) for pair in zip(best.get(stage, seconds), seconds)]
+    tracemalloc.start()
+    peaks, _ = replay(transcripts, outputs, traced_peak)
+    tracemalloc.stop()
+    results = {
+        f"generate_response[{stage}]": {
+            "calls": len(peaks[stage]),
+            "us_per_call": sum(best[stage]) / len(best[stage]) * 1e6,
+            "peak_kib_per_call": sum(peaks[stage]) / len(peaks[stage]) / 1024,
+        }
+        for stage in best
+    }
+    return results, digest
+
+def current_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def change(value, baseline):
+    return (value - baseline) / baseline if baseline else 0.0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay recorded transcripts and LLM outputs through the per-turn functions.")
+    parser.add_argument("--repeat", type=int, default=7, help="timed passes per function; the best is kept")
+    parser.add_argument("--number", type=int, default=200, help="calls per input in each parse/extract pass")
+    parser.add_argument("--save", help="where to write this run's results (default: benchmarks/results/, "
+                                       "timestamped); an empty string skips saving")
+    parser.add_argument("--baseline", help="results file of an earlier run to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.25,
+                        help="largest allowed fractional slowdown or allocation growth against --baseline")
+    args = parser.parse_args(argv)
+
+    # Questions are parsed from the recorded output as it streams in; replay() picks the
+    # structured or text path for each transcript from its output's format
+    os.environ.update(LLM_BACKEND="stub", CANDIDATE_DB="", QUESTION_BANK_DB="", QUESTION_PACK="",
+                      STREAM_QUESTIONS="1", QUESTION_WARMUP="0", PROFILE_MODE="off")
+    # The messy JSON output logs a validation warning on every replay
+    logging.getLogger("prompts").setLevel(logging.ERROR)
+    transcripts, outputs = load_fixtures()
+    results = {}
+    for name, calls in micro_cases(transcripts, outputs):
+        results[name] = measure_micro(calls, args.repeat, args.number)
+    turn_results, replies = measure_turns(transcripts, outputs, args.repeat)
+    results.update(turn_results)
+
+    run = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "commit": current_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "fixtures": fixtures_digest(transcripts, outputs),
+        "replies": replies,
+        "repeat": args.repeat,
+        "number": args.number,
+        "results": results,
+    }
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline["fixtures"] != run["fixtures"]:
+            print(f"warning: {args.baseline} was recorded with different fixtures")
+        elif baseline["replies"] != run["replies"]:
+            print(f"warning: replies differ from {args.baseline}; the conversation flow has changed since")
+
+    print(f"{'function':<40} {'calls':>5} {'us/call':>10} {'peak KiB/call':>14}" + ("   vs baseline" if baseline else ""))
+    regressions = []
+    for name, result in results.items():
+        line = f"{name:<40} {result['calls']:>5} {result['us_per_call']:>10.2f} {result['peak_kib_per_call']:>14.2f}"
+        previous = baseline["results"].get(name) if baseline else None
+        if previous:
+            time_change = change(result["us_per_call"], previous["us_per_call"])
+            memory_change = change(result["peak_kib_per_call"], previous["peak_kib_per_call"])
+            line += f"   time {time_change:+7.1%}  alloc {memory_change:+7.1%}"
+            if time_change > args.max_regression or memory_change > args.max_regression:
+                regressions.append(name)
+        print(line)
+
+    save = os.path.join(RESULTS_DIR, time.strftime("bench_turns-%Y%m%d-%H%M%S.json")) if args.save is None else args.save
+    if save:
+        os.makedirs(os.path.dirname(os.path.abspath(save)), exist_ok=True)
+        with open(save, "w") as f:
+            json.dump(run, f, indent=2)
+        print(f"saved {save} (compare later runs with --baseline {save})")
+
+    if regressions:
+        print(f"FAIL: more than {args.max_regression:.0%} slower or allocating more than {args.baseline}: "
+              f"{', '.join(regressions)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CANDIDATE_DB_PATH = os.getenv("CANDIDATE_DB", "candidates.db")
+WRITE_BATCH_SIZE = int(os.getenv("CANDIDATE_WRITE_BATCH_SIZE", "500"))
+WRITE_INTERVAL = float(os.getenv("CANDIDATE_WRITE_INTERVAL", "0.2"))
+WRITE_QUEUE_SIZE = int(os.getenv("CANDIDATE_WRITE_QUEUE_SIZE", "100000"))
+
+RECORD_FIELDS = ("session_id", "status", "name", "email", "phone", "experience", "location",
+                 "position", "score", "answers", "completed_at")
+
+_STOP = object()
+
+class CandidateStore:
+    """Write-behind store of candidate details and assessment results in SQLite
+
+    submit() only enqueues, so persisting never blocks a chat turn. A single writer
+    thread drains the queue and commits up to `batch_size` records per transaction
+    on a WAL-mode database; records for a session id that is already stored replace it.
+    While the database cannot be opened, batches are dropped with an error and the
+    connection is retried for the next one.
+    """
+
+    def __init__(self, db_path=CANDIDATE_DB_PATH, batch_size=WRITE_BATCH_SIZE,
+                 interval=WRITE_INTERVAL, queue_size=WRITE_QUEUE_SIZE):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.interval = interval
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stats = {"submitted": 0, "written": 0, "dropped": 0, "batches": 0}
+        self._stats_lock = threading.Lock()
+        self._writer = None
+        if db_path:
+            self._writer = threading.Thread(target=self._run, name="candidate-writer", daemon=True)
+            self._writer.start()
+
+    def submit(self, record):
+        """Queue a record (a dict keyed by RECORD_FIELDS, `answers` a list) for writing; never blocks"""
+        if self._writer is None:
+            return False
+        record = dict(record, answers=json.dumps(record.get("answers") or []))
+        row = tuple(record.get(field) for field in RECORD_FIELDS)
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self._count("dropped")
+            logger.warning("Candidate write queue is full, dropping record for %s", record.get("session_id"))
+            return False
+        self._count("submitted")
+        return True
+
+    def flush(self, timeout=None):
+        """Block until everything submitted so far is committed; returns False on timeout"""
+        if self._writer is None or not self._writer.is_alive():
+            return True
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout=10):
+        """Flush pending records and stop the writer thread"""
+        if self._writer is None:
+            return
+        self.flush(timeout)
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self._writer.join(timeout)
+        self._writer = None
+
+    def stats(self):
+        with self._stats_lock:
+            return dict(self._stats, queued=self._queue.qsize())
+
+    def fetch(self, session_id):
+        """Read a committed record back, or None (uses its own connection)"""
+        if not self.db_path:
+            return None
+        try:
+            with sqlite3.connect(self.db_path) as db:
+                row = db.execute(
+                    f"SELECT {', '.join(RECORD_FIELDS)} FROM candidates WHERE session_id = ?", (session_id,)
+                ).fetchone()
+        except sqlite3.OperationalError:
+            return None
+        if row is None:
+            return None
+        record = dict(zip(RECORD_FIELDS, row))
+        record["answers"] = json.loads(record["answers"]) if record["answers"] else []
+        return record
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    def _connect(self):
+        db = sqlite3.connect(self.db_path)
+        try:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS candidates ("
+                "session_id TEXT PRIMARY KEY, status TEXT NOT NULL, name TEXT, email TEXT, phone TEXT, "
+                "experience TEXT, location TEXT, position TEXT, score REAL, answers TEXT, "
+                "completed_at REAL NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS candidates_email ON candidates (email)")
+            db.commit()
+        except sqlite3.Error:
+            db.close()
+            raise
+        return db
+
+    def _open(self):
+        """Connect to the database, or log why not and return None"""
+        try:
+            return self._connect()
+        except sqlite3.Error as e:
+            logger.error("Cannot open candidate database %s: %s", self.db_path, e)
+            return None
+
+    def _run(self):
+        db = self._open()
+        stopping = False
+        while not stopping:
+            batch, waiters = [], []
+            item = self._queue.get()
+            deadline = time.monotonic() + self.interval
+            while True:
+                if item is _STOP:
+                    stopping = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                if stopping or waiters or len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            if batch and db is None:
+                db = self._open()
+            if batch and db is None:
+                self._count("dropped", len(batch))
+                logger.error("Dropped %d candidate records: database %s is unavailable", len(batch), self.db_path)
+            elif batch:
+                self._write(db, batch)
+            for waiter in waiters:
+                waiter.set()
+        if db is not None:
+            db.close()
+
+    def _write(self, db, batch):
+        try:
+            with db:
+                db.executemany(
+                    f"INSERT OR REPLACE INTO candidates ({', '.join(RECORD_FIELDS)}) "
+                    f"VALUES ({', '.join('?' for _ in RECORD_FIELDS)})",
+                    batch
+                )
+        except sqlite3.Error as e:
+            self._count("dropped", len(batch))
+            logger.error("Failed to write %d candidate records: %s", len(batch), e)
+            return
+        self._count("written", len(batch))
+        self._count("batches")
+
+_candidate_store = None
+_candidate_store_lock = threading.Lock()
+
+def get_candidate_store():
+    """Return the process-wide candidate store, flushed on interpreter exit"""
+    global _candidate_store
+    if _candidate_store is None:
+        with _candidate_store_lock:
+            if _candidate_store is None:
+                _candidate_store = CandidateStore()
+                atexit.register(_candidate_store.close)
+    return _candidate_store
@@ -0,0 +1,516 @@
+import logging
+import os
+import random
+import time
+import uuid
+from array import array
+from adaptive import ADAPTIVE_TESTING, AbilityEstimate, cutoff_ability, decision_reached, \
+    expected_percentage, item_difficulty, select_item
+from candidate_store import get_candidate_store
+from metrics import timer
+from profiling import PROFILE_MODE, profiled
+from extraction import INTAKE_FIELDS, MAX_MESSAGE_LENGTH, scan_intake, scan_message
+from question_jobs import QUESTION_NEXT_BUDGET, QUESTION_WAIT_BUDGET, finished_question_job, record_budget_miss
+from question_pack import get_question_pack, resolve_question
+from questions import MAX_QUESTIONS, build_fallback_questions, fallback_questions, start_position_questions
+
+logger = logging.getLogger(__name__)
+
+# Once the transcript exceeds TRANSCRIPT_LIMIT messages the oldest TRANSCRIPT_TRIM are dropped
+TRANSCRIPT_LIMIT = int(os.getenv("TRANSCRIPT_LIMIT", "200"))
+TRANSCRIPT_TRIM = int(os.getenv("TRANSCRIPT_TRIM", "50"))
+ANSWER_LETTERS = "ABCD"
+PASS_PERCENTAGE = float(os.getenv("PASS_PERCENTAGE", "60"))
+
+GREETING = "Hello! Welcome to TalentScout. Please say 'hi' to start the conversation."
+
+# Asked once the previous field has been captured
+INTAKE_PROMPTS = {
+    "name": "Could you please tell me your full name?",
+    "email": "Could you please share your email address?",
+    "phone": "Thanks! Now, could you please provide your phone number?",
+    "experience": "Great! How many years of professional experience do you have? (Please provide just the number)",
+    "location": "Thanks! What is your current location?",
+    "position": "What position are you applying for?",
+}
+
+INTAKE_RETRY_PROMPTS = {
+    "name": "I didn't catch your name. Could you please tell me your full name?",
+    "email": "I need your email address to proceed. Please provide a valid email (example: name@example.com).",
+    "phone": "I need your phone number to proceed. Please provide a valid phone number.",
+    "experience": "I need to know your years of experience. Please specify just the number (e.g., '3' or '0' for fresher).",
+    "location": "I need your current location to proceed. Please provide your city/country.",
+    "position": "Please specify the position you're applying for.",
+}
+
+INTAKE_LABELS = {
+    "name": "name",
+    "email": "email",
+    "phone": "phone number",
+    "experience": "experience",
+    "location": "location",
+    "position": "position",
+}
+
+# Persisted by to_state(); the list fields only grow between trims and screenings
+STATE_FIELDS = (
+    "session_id", "conversation_started", "collected_info", "test_confirmed", "assessment_complete",
+    "final_percentage", "current_question_index", "max_possible_score", "ended", "saved", "trimmed_messages",
+    "adaptive", "questions_received",
+)
+STATE_LISTS = ("messages", "mcq_questions", "user_answers", "question_pool")
+
+class AnswerLog:
+    """Answers in question order, one byte each: the option's index plus 4 if it was correct"""
+
+    __slots__ = ("codes",)
+
+    def __init__(self, codes=()):
+        self.codes = array("B", codes)
+
+    def append(self, answer, correct):
+        self.codes.append(ANSWER_LETTERS.index(answer) | (4 if correct else 0))
+
+    def correct_count(self):
+        return sum(1 for code in self.codes if code & 4)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __iter__(self):
+        """Yield (question_index, answer, correct) for each answer"""
+        for index, code in enumerate(self.codes):
+            yield index, ANSWER_LETTERS[code & 3], bool(code & 4)
+
+class ConversationEngine:
+    """Headless intake and assessment state machine for one candidate conversation
+
+    Holds everything a conversation needs in slots, independent of Streamlit, so
+    any number of sessions can be hosted or benchmarked in one process.
+    """
+
+    __slots__ = (
+        "messages", "conversation_started", "collected_info", "test_confirmed",
+        "assessment_complete", "final_percentage", "mcq_questions", "question_job",
+        "current_question_index", "user_answers", "max_possible_score", "ended",
+        "session_id", "saved", "trimmed_messages", "adaptive", "question_pool", "questions_received",
+        "asked_before_restore",
+    )
+
+    def __init__(self, adaptive=ADAPTIVE_TESTING):
+        self.messages = [{"role": "assistant", "content": GREETING}]
+        self.conversation_started = False
+        self.collected_info = {
+            "name": None,
+            "email": None,
+            "phone": None,
+            "position": None,
+            "experience": None,
+            "location": None
+        }
+        self.test_confirmed = False
+        self.assessment_complete = False
+        self.final_percentage = 0
+        self.mcq_questions = []
+        self.question_job = None
+        self.current_question_index = 0
+        self.user_answers = AnswerLog()
+        self.max_possible_score = 0
+        self.ended = False
+        self.session_id = uuid.uuid4().hex
+        self.saved = False
+        self.trimmed_messages = 0
+        # In adaptive mode questions wait in the pool until selected; mcq_questions is always in asked order
+        self.adaptive = adaptive
+        self.question_pool = []
+        self.questions_received = 0
+        # Texts of the questions a restored session already had, when its job had to be started again
+        self.asked_before_restore = None
+
+    def to_state(self):
+        """Return the conversation as plain data that from_state() can rebuild
+
+        Asked questions are saved decoded, as they are part of the candidate's record;
+        pooled pack questions stay ids, saved with the id of the pack they belong to.
+        A finished job's questions are saved too, so a restored session carries on with
+        the same sequence rather than a new draw that may repeat earlier questions.
+        """
+        state = {field: getattr(self, field) for field in STATE_FIELDS + STATE_LISTS}
+        state["mcq_questions"] = [self.question(index) for index in range(len(self.mcq_questions))]
+        state["user_answers"] = self.user_answers.codes.tolist()
+        job = self.question_job
+        state["awaiting_questions"] = job is not None
+        state["job_questions"] = list(job.questions) if job is not None and job.done else None
+        pooled = self.question_pool + (state["job_questions"] or [])
+        pack = get_question_pack() if any(isinstance(q, int) for q in pooled) else None
+        state["question_pack_id"] = pack.pack_id if pack is not None else None
+        return state
+
+    @classmethod
+    def from_state(cls, state):
+        """Rebuild an engine from to_state() output, possibly in another process
+
+        A finished job is resumed from its saved questions. Background generation does
+        not survive the move, so a job that was still producing questions is started
+        again for the same position, and questions the candidate already had are skipped
+        in its new sequence. Pack ids are only kept if this process has the same pack
+        loaded; otherwise they are dropped and questions drawn again.
+        """
+        engine = cls()
+        for field in STATE_FIELDS + STATE_LISTS:
+            if field in state:
+                setattr(engine, field, state[field])
+        engine.user_answers = AnswerLog(state.get("user_answers", ()))
+        position = engine.collected_info.get("position")
+        job_questions = state.get("job_questions")
+        redraw = False
+        pack = get_question_pack()
+        if pack is None or pack.pack_id != state.get("question_pack_id"):
+            if any(isinstance(q, int) for q in engine.question_pool + (job_questions or [])):
+                logger.warning("Session %s was saved with another question pack; drawing its pool again", engine.session_id)
+                engine.question_pool = [q for q in engine.question_pool if not isinstance(q, int)]
+                job_questions = None
+                redraw = not engine.assessment_complete
+            # Sessions saved before asked questions were stored decoded
+            engine.mcq_questions = [engine.restored_question(q) for q in engine.mcq_questions]
+        if (redraw or state.get("awaiting_questions")) and position:
+            if job_questions is not None and not redraw:
+                engine.question_job = finished_question_job(job_questions)
+            else:
+                engine.questions_received = 0
+                engine.asked_before_restore = engine.asked_question_texts()
+                engine.question_job = start_position_questions(position)
+        return engine
+
+    def restored_question(self, question):
+        """A saved question as a dict; pack ids whose pack is gone become a fallback question"""
+        if not isinstance(question, int):
+            return question
+        logger.warning("Session %s has a question from an unavailable question pack", self.session_id)
+        fallback = build_fallback_questions(self.collected_info.get("position") or "this")
+        return self.with_answer_key(fallback[question % len(fallback)])
+
+    def step(self, user_input):
+        """Handle one candidate message, record both turns and return the reply"""
+        self.record_message({"role": "user", "content": user_input[:MAX_MESSAGE_LENGTH]})
+        entities = scan_message(user_input)
+        
+        if entities.exit:
+            if not self.saved and any(self.collected_info.values()):
+                self.save_result("exited")
+            if self.assessment_complete:
+                reply = "Thank you for using TalentScout! Your information has been saved. Goodbye!"
+                self.ended = True
+            else:
+                reply = "Thank you for your time! A recruiter will review your information and get back to you shortly. Have a great day!"
+        else:
+            reply = self.generate_response(user_input, entities)
+        
+        message = reply if isinstance(reply, dict) else {"role": "assistant", "content": reply}
+        self.record_message(message)
+        return self.message_text(message)
+
+    def record_message(self, message):
+        """Append to the transcript, dropping the oldest messages once it passes TRANSCRIPT_LIMIT"""
+        self.messages.append(message)
+        if len(self.messages) > TRANSCRIPT_LIMIT:
+            trim = min(TRANSCRIPT_TRIM, len(self.messages) - 1)
+            del self.messages[:trim]
+            self.trimmed_messages += trim
+
+    def question_message(self, index, lead):
+        """Compact transcript entry for asking question `index`; the text is rebuilt on demand"""
+        return {"role": "assistant", "lead": lead, "question": index}
+
+    def question(self, index):
+        """Asked question `index` as a dict; question pack entries are stored by id and decoded here"""
+        return resolve_question(self.mcq_questions[index])
+
+    def message_text(self, message):
+        """Return the displayed text of a transcript entry"""
+        if "question" not in message:
+            return message["content"]
+        index = message["question"]
+        question = self.question(index)
+        options_text = "".join(f"\n- {ANSWER_LETTERS[i]}) {opt}" for i, opt in enumerate(question['options']))
+        return f"{message['lead']}\n\nQuestion {index + 1}: {question['question']}{options_text}\n\nPlease select A, B, C, or D."
+
+    def result_record(self, status):
+        """Snapshot of the candidate's details and answers for the candidate store"""
+        answers = []
+        for index, answer, correct in self.user_answers:
+            question = self.question(index)
+            answers.append({
+                'question': question['question'],
+                'user_answer': answer,
+                'correct_answer': question['correct_answer'],
+                'correct': correct,
+            })
+        return dict(
+            self.collected_info,
+            session_id=self.session_id,
+            status=status,
+            score=self.final_percentage if self.assessment_complete else None,
+            answers=answers,
+            completed_at=time.time(),
+        )
+
+    def save_result(self, status):
+        """Hand the current result to the write-behind store; returns immediately"""
+        get_candidate_store().submit(self.result_record(status))
+        self.saved = True
+
+    def missing_intake_fields(self):
+        return [field for field in INTAKE_FIELDS if not self.collected_info[field]]
+
+    def capture_intake_fields(self, user_input):
+        """Fill every missing field found in a multi-field message; returns the fields captured
+
+        Only kicks in when the message carries at least two missing fields, so one-answer
+        turns keep going through the field-by-field path.
+        """
+        found = scan_intake(user_input, self.missing_intake_fields())
+        if len(found) < 2:
+            return []
+        self.collected_info.update(found)
+        return [field for field in INTAKE_FIELDS if field in found]
+
+    def extract_intake_field(self, field, user_input, entities):
+        if field == "experience":
+            return entities.experience or ("0" if entities.fresher else None)
+        if field in ("location", "position"):
+            value = user_input.strip()
+            return value if len(value) > 1 else None
+        return getattr(entities, field)
+
+    def intake_reply(self, captured):
+        missing = self.missing_intake_fields()
+        if not missing:
+            return self.begin_screening()
+        
+        reply = INTAKE_PROMPTS[missing[0]]
+        if len(captured) > 1:
+            labels = [INTAKE_LABELS[field] for field in captured]
+            noted = f"{', '.join(labels[:-1])} and {labels[-1]}"
+            reply = f"I've noted your {noted}. {reply}"
+        if "name" in captured:
+            reply = f"Nice to meet you, {self.collected_info['name']}! {reply}"
+        return reply
+
+    def begin_screening(self):
+        """Start question generation for the collected position and ask for consent"""
+        position = self.collected_info["position"]
+        self.mcq_questions = []
+        self.question_pool = []
+        self.questions_received = 0
+        self.current_question_index = 0
+        self.user_answers = AnswerLog()
+        self.asked_before_restore = None
+        
+        self.question_job = start_position_questions(position)
+        
+        return f"Thank you for providing your information! I'd like to conduct a small screening test for the {position} position. Are you okay with that? (Please say 'yes' or 'no')"
+
+    def ensure_question_loaded(self, index):
+        """Make question `index` available, waiting on the background job at most this stage's budget
+
+        In adaptive mode every question the job has already produced joins the pool and
+        the one most informative at the current ability estimate is asked next.
+        """
+        budget = QUESTION_WAIT_BUDGET if index == 0 else QUESTION_NEXT_BUDGET
+        while len(self.mcq_questions) <= index:
+            if self.adaptive:
+                self.drain_question_job()
+                if self.question_pool:
+                    self.mcq_questions.append(self.question_pool.pop(self.select_question()))
+                    continue
+            question = self.receive_question(index, budget)
+            if question is None:
+                break
+            if self.adaptive:
+                self.question_pool.append(question)
+            else:
+                self.mcq_questions.append(question)
+        return index < len(self.mcq_questions)
+
+    def receive_question(self, index, budget):
+        """Take the job's next question, waiting at most `budget` seconds; None once it has no more
+
+        When a later question misses its budget the slot is filled from the fallback bank
+        and the job keeps running for the questions after it, so no turn waits longer
+        than QUESTION_NEXT_BUDGET on generation.
+        """
+        if self.question_job is None:
+            return None
+        started = time.monotonic()
+        question = self.next_job_question(budget)
+        if question is None and not self.question_job.done:
+            record_budget_miss("first" if index == 0 else "next", time.monotonic() - started)
+            if index > 0:
+                question = self.next_fallback_question()
+        if question is None:
+            self.question_job = None
+            return None
+        return self.with_answer_key(question)
+
+    def drain_question_job(self):
+        """Move every question the job has produced so far into the pool without waiting"""
+        while self.question_job is not None:
+            question = self.next_job_question(0)
+            if question is None:
+                if self.question_job.done:
+                    self.question_job = None
+                break
+            self.question_pool.append(self.with_answer_key(question))
+
+    def next_job_question(self, timeout):
+        """The job's next question within `timeout` seconds, skipping any asked before a restore"""
+        deadline = time.monotonic() + timeout
+        while True:
+            question = self.question_job.wait_for(self.questions_received, max(0.0, deadline - time.monotonic()))
+            if question is None:
+                return None
+            self.questions_received += 1
+            if not self.asked_before_restore or resolve_question(question)['question'] not in self.asked_before_restore:
+                return question
+
+    def with_answer_key(self, question):
+        # Questions are only read after this, so they are shared with the bank (or kept as pack ids) unless a key is added
+        resolved = resolve_question(question)
+        if not resolved['correct_answer']:
+            question = dict(resolved, correct_answer=random.choice(['A', 'B', 'C', 'D']))
+        return question
+
+    def ability_estimate(self):
+        return AbilityEstimate.from_responses(
+            (item_difficulty(self.question(index)), correct) for index, _, correct in self.user_answers
+        )
+
+    def select_question(self):
+        """Index in question_pool of the question most informative at the current ability estimate"""
+        ability = self.ability_estimate().mean()
+        return select_item([item_difficulty(resolve_question(q)) for q in self.question_pool], ability)
+
+    def decision_reached(self):
+        """Whether adaptive mode is already confident enough to pass or fail the candidate"""
+        return self.adaptive and decision_reached(
+            self.ability_estimate(), cutoff_ability(PASS_PERCENTAGE), len(self.user_answers)
+        )
+
+    def score_percentage(self):
+        """Raw share of correct answers, or in adaptive mode the expected share on medium questions"""
+        if self.adaptive:
+            return expected_percentage(self.ability_estimate().mean())
+        return (self.user_answers.correct_count() / self.max_possible_score) * 100
+
+    def asked_question_texts(self):
+        """Texts of the questions asked or pooled so far"""
+        return {resolve_question(q)['question'] for q in self.mcq_questions + self.question_pool}
+
+    def next_fallback_question(self):
+        asked = self.asked_question_texts()
+        for question in fallback_questions(self.collected_info["position"]):
+            if resolve_question(question)['question'] not in asked:
+                return question
+        return None
+
+    def expected_question_count(self):
+        available = len(self.mcq_questions) + len(self.question_pool)
+        if self.question_job is not None:
+            return max(available, MAX_QUESTIONS)
+        return available
+
+    def stage(self):
+        """Name of the state machine branch the next message will go through"""
+        if not self.conversation_started:
+            return "greeting"
+        if self.missing_intake_fields():
+            return "intake"
+        if not self.test_confirmed:
+            return "consent"
+        if self.current_question_index < len(self.mcq_questions):
+            return "answer"
+        return "finished"
+
+    def generate_response(self, user_input, entities=None):
+        """Advance the intake/assessment state machine and return the reply text or a question message"""
+        if entities is None:
+            entities = scan_message(user_input)
+        stage = self.stage()
+        with profiled(f"turn-{stage}", PROFILE_MODE == "turn", self.session_id), \
+                timer("turn_stage_seconds", stage=stage):
+            return self.advance(user_input, entities)
+
+    def advance(self, user_input, entities):
+        if not self.conversation_started:
+            if "hi" in user_input.lower() or "hello" in user_input.lower() or "hey" in user_input.lower():
+                self.conversation_started = True
+                captured = self.capture_intake_fields(user_input)
+                if captured:
+                    return self.intake_reply(captured)
+                return "Hello! Welcome to TalentScout. Could you please tell me your full name?"
+            else:
+                return "Hello! Please say 'hi' to start the conversation."
+        
+        elif self.missing_intake_fields():
+            captured = self.capture_intake_fields(user_input)
+            if not captured:
+                field = self.missing_intake_fields()[0]
+                value = self.extract_intake_field(field, user_input, entities)
+                if not value:
+                    return INTAKE_RETRY_PROMPTS[field]
+                self.collected_info[field] = value
+                captured = [field]
+            return self.intake_reply(captured)
+    
+        elif not self.test_confirmed:
+            confirmation = entities.confirmation
+            if confirmation is True:
+                self.test_confirmed = True
+            
+                if not self.ensure_question_loaded(0):
+                    fallback = [self.with_answer_key(q) for q in fallback_questions(self.collected_info["position"])]
+                    if self.adaptive:
+                        self.question_pool = fallback
+                        self.ensure_question_loaded(0)
+                    else:
+                        self.mcq_questions = fallback
+            
+                self.max_possible_score = self.expected_question_count()
+                return self.question_message(0, "Great! Let's begin the assessment.")
+            elif confirmation is False:
+                self.save_result("declined")
+                return "No problem. We can schedule this for later. A recruiter will contact you shortly. Have a great day!"
+            else:
+                return "I didn't understand. Are you okay with taking a small screening test for this position? (Please say 'yes' or 'no')"
+    
+        else:
+            if self.current_question_index < len(self.mcq_questions):
+                answer = entities.mcq_answer
+            
+                if answer in ['A', 'B', 'C', 'D']:
+                    current_q = self.question(self.current_question_index)
+                    correct = current_q['correct_answer'] == answer
+                
+                    self.user_answers.append(answer, correct)
+                
+                    self.current_question_index += 1
+                
+                    if not self.decision_reached() and self.ensure_question_loaded(self.current_question_index):
+                        return self.question_message(self.current_question_index, "Thank you!")
+                    else:
+                        self.max_possible_score = len(self.user_answers)
+                        percentage = self.score_percentage()
+                        self.final_percentage = round(percentage, 1)
+                        self.assessment_complete = True
+                        self.save_result("completed")
+                    
+                        if percentage >= PASS_PERCENTAGE:
+                            return f"Congratulations! You've completed the assessment with a score of {self.final_percentage}%. This is above our cutoff of {PASS_PERCENTAGE:g}%. A recruiter will contact you soon for the next steps. Thank you for your time! You can exit now by typing 'exit'."
+                        else:
+                            return f"Thank you for completing the assessment. Your score is {self.final_percentage}%. Our cutoff score is {PASS_PERCENTAGE:g}%. We appreciate your interest and time. You can exit now by typing 'exit'."
+                else:
+                    return "Please select a valid option (A, B, C, or D)."
+        
+            else:
+                return "Your assessment is already complete. A recruiter will contact you shortly. You can exit now by typing 'exit'."
@@ -0,0 +1,302 @@
+import re
+from metrics import timed
+from utils import validate_email, validate_phone
+
+MAX_MESSAGE_LENGTH = 2000
+MIN_PHONE_DIGITS = 7
+MAX_PHONE_DIGITS = 15
+
+# Every pattern here is either a single character class or a sequence with no overlapping
+# alternatives, so a match attempt can never backtrack over more than it consumed.
+RUN_PATTERN = re.compile(r"\S+")
+WORD_SPLIT_PATTERN = re.compile(r"\W+")
+PHONE_RUN_PATTERN = re.compile(r"[\d+().\-]+")
+DOMAIN_PATTERN = re.compile(r"[A-Za-z0-9\-]+(?:\.[A-Za-z0-9\-]+)+")
+NUMBER_PATTERN = re.compile(r"\d+")
+
+EDGE_PUNCTUATION = "\"'`([{<>}]),;:!?"
+PHONE_EDGE_PUNCTUATION = "\"'`,;:!?."
+GROUP_SEPARATORS = ",;"
+EMAIL_LOCAL_CHARS = frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789._%+-")
+
+NAME_PREFIXES = (("my", "name", "is"), ("i", "am"), ("i'm",))
+NAME_SUFFIXES = frozenset(["here", "speaking"])
+YES_WORDS = frozenset(["yes", "yeah", "yep", "yup", "sure", "ok", "okay", "proceed"])
+NO_WORDS = frozenset(["no", "nope", "nah", "later"])
+YES_PHRASES = (("go", "ahead"),)
+NO_PHRASES = (("not", "now"),)
+EXIT_WORDS = frozenset(["exit", "quit", "goodbye", "bye", "stop", "end", "done"])
+YEAR_WORDS = frozenset(["year", "years", "yr", "yrs"])
+MCQ_LETTERS = frozenset("ABCD")
+
+class MessageEntities:
+    """Everything the scanner found in one message"""
+
+    __slots__ = ("name", "email", "phone", "experience", "fresher", "confirmation", "mcq_answer", "exit")
+
+    def __init__(self):
+        self.name = None
+        self.email = None
+        self.phone = None
+        self.experience = None
+        self.fresher = False
+        self.confirmation = None
+        self.mcq_answer = None
+        self.exit = False
+
+def _is_name_word(run):
+    return run.isascii() and run.isalpha()
+
+def _find_email(run):
+    at = run.find("@")
+    while at != -1:
+        start = at
+        while start > 0 and run[start - 1] in EMAIL_LOCAL_CHARS:
+            start -= 1
+        domain = DOMAIN_PATTERN.match(run, at + 1)
+        if start < at and domain:
+            tld = domain.group(0).rsplit(".", 1)[1]
+            email = run[start:domain.end()]
+            if len(tld) >= 2 and tld.isalpha() and validate_email(email):
+                return email
+        at = run.find("@", at + 1)
+    return None
+
+def _phrase_at(words, index, phrase):
+    return tuple(words[index:index + len(phrase)]) == phrase
+
+@timed("extract_seconds", helper="scan_message")
+def scan_message(text, max_length=MAX_MESSAGE_LENGTH):
+    """Scan a message once and return every entity found in it
+
+    The message is capped at `max_length` characters and split into whitespace runs in a
+    single pass. Each run is classified with anchored, non-backtracking checks, so the
+    total cost is linear in the length of the message.
+    """
+    entities = MessageEntities()
+    if max_length is not None:
+        text = text[:max_length]
+
+    runs = []
+    words = []
+    numbers = []
+    year_runs = set()
+    phone_group = []
+
+    def flush_phone_group():
+        if not phone_group:
+            return
+        candidate = " ".join(run for _, run in phone_group)
+        digits = sum(c.isdigit() for c in candidate)
+        if entities.phone is None and MIN_PHONE_DIGITS <= digits <= MAX_PHONE_DIGITS and validate_phone(candidate):
+            entities.phone = candidate
+        else:
+            for index, run in phone_group:
+                numbers.extend((index, n) for n in NUMBER_PATTERN.findall(run))
+        phone_group.clear()
+
+    for match in RUN_PATTERN.finditer(text):
+        raw = match.group(0)
+        run = raw.strip(EDGE_PUNCTUATION)
+        ends_group = raw[-1] in GROUP_SEPARATORS
+        index = len(runs)
+        runs.append((run.lower(), ends_group))
+        words.extend(w for w in WORD_SPLIT_PATTERN.split(raw) if w)
+
+        if "@" in run and entities.email is None:
+            entities.email = _find_email(run)
+
+        has_digits = any(c.isdigit() for c in run)
+        phone_run = raw.strip(PHONE_EDGE_PUNCTUATION)
+        if has_digits and PHONE_RUN_PATTERN.fullmatch(phone_run):
+            phone_group.append((index, phone_run))
+            if ends_group:
+                flush_phone_group()
+        else:
+            flush_phone_group()
+            if has_digits:
+                numbers.extend((index, n) for n in NUMBER_PATTERN.findall(run))
+                if run.lower().lstrip("0123456789") in YEAR_WORDS:
+                    year_runs.add(index)
+    flush_phone_group()
+
+    lowered = [w.lower() for w in words]
+    for i, word in enumerate(lowered):
+        if word in EXIT_WORDS:
+            entities.exit = True
+        if word == "fresher":
+            entities.fresher = True
+        if entities.mcq_answer is None and len(word) == 1 and word.upper() in MCQ_LETTERS:
+            entities.mcq_answer = word.upper()
+        if entities.confirmation is None:
+            if word in YES_WORDS or any(_phrase_at(lowered, i, p) for p in YES_PHRASES):
+                entities.confirmation = True
+    if entities.confirmation is None:
+        for i, word in enumerate(lowered):
+            if word in NO_WORDS or any(_phrase_at(lowered, i, p) for p in NO_PHRASES):
+                entities.confirmation = False
+                break
+
+    if numbers:
+        entities.experience = numbers[0][1]
+        for index, number in numbers:
+            unit = runs[index + 1][0] if index + 1 < len(runs) else ""
+            if unit in YEAR_WORDS or index in year_runs:
+                entities.experience = number
+                break
+
+    entities.name = _scan_name(runs)
+    return entities
+
+def _scan_name(runs):
+    run_words = [run for run, _ in runs]
+    for prefix in NAME_PREFIXES:
+        for i in range(len(run_words) - len(prefix) + 1):
+            if tuple(run_words[i:i + len(prefix)]) == prefix:
+                return _title_name(_collect_name(runs, i + len(prefix), 1))
+    for i, word in enumerate(run_words):
+        if word in NAME_SUFFIXES and i > 0:
+            return _title_name(_collect_name(runs, i - 1, -1))
+    if run_words and all(_is_name_word(word) for word in run_words):
+        # A bare name is the first comma-separated group: "John Smith, nice to meet you"
+        return _title_name(_collect_name(runs, 0, 1))
+    return None
+
+def _collect_name(runs, index, direction):
+    collected = []
+    while 0 <= index < len(runs):
+        run, ends_group = runs[index]
+        if not _is_name_word(run) or (direction < 0 and ends_group):
+            break
+        collected.append(run)
+        if direction > 0 and ends_group:
+            break
+        index += direction
+    return collected if direction > 0 else collected[::-1]
+
+def _title_name(words):
+    name = " ".join(words).title()
+    return name if len(name) > 1 else None
+
+def extract_name(text):
+    return scan_message(text).name
+
+def extract_email(text):
+    return scan_message(text).email
+
+def extract_phone(text):
+    return scan_message(text).phone
+
+def extract_experience(text):
+    return scan_message(text).experience
+
+def extract_confirmation(text):
+    return scan_message(text).confirmation
+
+def extract_mcq_answer(text):
+    return scan_message(text).mcq_answer
+
+INTAKE_SEGMENT_PATTERN = re.compile(r"[,;\n|]+")
+POSITION_PREFIXES = ("applying for the ", "applying for a ", "applying for an ", "applying for ", "applying as a ",
+                     "applying as an ", "i'm a ", "i'm an ", "i am a ", "i am an ", "working as a ",
+                     "working as an ", "position: ", "role: ")
+LOCATION_PREFIXES = ("based in ", "located in ", "living in ", "i live in ", "live in ", "from ", "location: ")
+ROLE_WORDS = frozenset(["developer", "engineer", "manager", "analyst", "scientist", "designer", "architect",
+                        "administrator", "tester", "consultant", "programmer", "intern", "lead", "specialist"])
+GREETING_SEGMENTS = frozenset(["hi", "hello", "hey", "hi there", "hello there"])
+# Segments made only of these (or of yes/no words) are pleasantries, not field values
+FILLER_WORDS = frozenset(["hi", "hello", "hey", "there", "thanks", "thank", "you", "thx", "please", "nice", "to",
+                          "meet", "pleased", "glad", "great", "cool", "fine", "good", "well", "so", "and", "also",
+                          "here", "it", "is", "it's", "its", "this", "that", "sorry", "oh", "um", "uh", "hmm"])
+TRAILING_CLAUSE_PATTERN = re.compile(r"\s+(?:with|having)\s.*$", re.IGNORECASE)
+MAX_EXPERIENCE_DIGITS = 2
+# An unlabelled place is at most this many words, as in "Rio de Janeiro", over at most two segments
+MAX_PLACE_WORDS = 4
+MAX_PLACE_SEGMENTS = 2
+INTAKE_FIELDS = ("name", "email", "phone", "experience", "location", "position")
+
+def _strip_prefix(segment, prefixes):
+    lowered = segment.lower()
+    for prefix in prefixes:
+        if lowered.startswith(prefix):
+            return segment[len(prefix):].strip()
+    return None
+
+def _is_filler(segment):
+    words = [word for word in WORD_SPLIT_PATTERN.split(segment.lower()) if word]
+    return all(word in FILLER_WORDS or word in YES_WORDS or word in NO_WORDS for word in words)
+
+def _is_labelled_name(segment):
+    lowered = segment.lower()
+    return lowered.startswith(("my name is", "i am", "i'm")) or lowered.rsplit(None, 1)[-1] in NAME_SUFFIXES
+
+def _looks_like_place(segment):
+    words = segment.split()
+    return (0 < len(words) <= MAX_PLACE_WORDS
+            and all(word.replace("-", "").replace(".", "").replace("'", "").isalpha() for word in words)
+            and not ROLE_WORDS.intersection(word.lower() for word in words))
+
+def _looks_like_role(segment):
+    from positions import POSITION_MATCH_THRESHOLD, get_role_index
+    # Raw words: clean_position() drops seniority words such as "lead" and "intern"
+    if ROLE_WORDS.intersection(word for word in WORD_SPLIT_PATTERN.split(segment.lower()) if word):
+        return True
+    return get_role_index().match(segment)[1] >= POSITION_MATCH_THRESHOLD
+
+@timed("extract_seconds", helper="scan_intake")
+def scan_intake(text, missing=INTAKE_FIELDS, max_length=MAX_MESSAGE_LENGTH):
+    """Pull every intake field out of a multi-field message
+
+    For example "I'm Jane Doe, jane@x.com, +1 555 123 4567, 5 years, based in Berlin,
+    data engineer". The message is split on commas, semicolons and newlines and each
+    segment is classified on its own; greetings and pleasantries are skipped. A bare name
+    is only taken when the name is being asked for (missing[0]) and it opens the message.
+    Other unclassified text becomes the location when that is being asked for, or once
+    the name is known, if it is one place-like segment or two adjacent ones ("Toronto,
+    Canada"). Returns a dict with only the fields that were found.
+    """
+    fields = {}
+    leftovers = []
+    asking = missing[0] if missing else None
+    if max_length is not None:
+        text = text[:max_length]
+
+    for index, segment in enumerate(INTAKE_SEGMENT_PATTERN.split(text)):
+        segment = segment.strip(" .!?")
+        if not segment or segment.lower() in GREETING_SEGMENTS or _is_filler(segment):
+            continue
+        entities = scan_message(segment, max_length=None)
+        first = not fields and not leftovers
+
+        if entities.email:
+            fields.setdefault("email", entities.email)
+        elif entities.phone:
+            fields.setdefault("phone", entities.phone)
+        elif _strip_prefix(segment, POSITION_PREFIXES) or _looks_like_role(segment):
+            position = _strip_prefix(segment, POSITION_PREFIXES) or segment
+            fields.setdefault("position", TRAILING_CLAUSE_PATTERN.sub("", position))
+            if entities.experience and len(entities.experience) <= MAX_EXPERIENCE_DIGITS:
+                fields.setdefault("experience", entities.experience)
+        elif entities.fresher or (entities.experience and len(entities.experience) <= MAX_EXPERIENCE_DIGITS):
+            fields.setdefault("experience", entities.experience or "0")
+        elif _strip_prefix(segment, LOCATION_PREFIXES):
+            fields.setdefault("location", _strip_prefix(segment, LOCATION_PREFIXES))
+        elif entities.name and _is_labelled_name(segment):
+            fields.setdefault("name", entities.name)
+        elif entities.confirmation is None:
+            leftovers.append((index, segment, entities, first))
+
+    places = []
+    for index, segment, entities, first in leftovers:
+        if asking == "name" and first and "name" not in fields and entities.name:
+            fields["name"] = entities.name
+        elif len(segment) > 1:
+            places.append((index, segment))
+    if places and "location" not in fields:
+        name_known = "name" in fields or "name" not in missing
+        adjacent = places[-1][0] - places[0][0] == len(places) - 1
+        if asking == "location" or (name_known and adjacent and len(places) <= MAX_PLACE_SEGMENTS
+                                    and all(_looks_like_place(segment) for _, segment in places)):
+            # "Toronto, Canada" is one location split on its comma
+            fields["location"] = ", ".join(segment for _, segment in places)
+    return {field: value for field, value in fields.items() if field in missing}
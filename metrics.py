@@ -0,0 +1,202 @@
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "0") == "1"
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))
+METRICS_FILE = os.getenv("METRICS_FILE", "")
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "15"))
+METRIC_PREFIX = "talentscout_"
+
+# Seconds; spans a regex scan (sub-millisecond) up to a slow LLM call
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class MetricsRegistry:
+    """Counters and latency histograms keyed by metric name and label set"""
+
+    def __init__(self):
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, value, labels=()):
+        key = (name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def increment(self, name, amount=1, labels=()):
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def render(self):
+        """Return every metric in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, list(h.counts), h.sum, h.count) for key, h in self._histograms.items())
+
+        declared = set()
+        for (name, labels), value in counters:
+            if name not in declared:
+                lines.append(f"# TYPE {METRIC_PREFIX}{name} counter")
+                declared.add(name)
+            lines.append(f"{METRIC_PREFIX}{name}{_format_labels(labels)} {value}")
+        for (name, labels), counts, total, count in histograms:
+            if name not in declared:
+                lines.append(f"# TYPE {METRIC_PREFIX}{name} histogram")
+                declared.add(name)
+            cumulative = 0
+            for bound, bucket in zip(LATENCY_BUCKETS + ("+Inf",), counts):
+                cumulative += bucket
+                lines.append(f"{METRIC_PREFIX}{name}_bucket{_format_labels(labels + (('le', str(bound)),))} {cumulative}")
+            lines.append(f"{METRIC_PREFIX}{name}_sum{_format_labels(labels)} {total:.6f}")
+            lines.append(f"{METRIC_PREFIX}{name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+class _Timer:
+    __slots__ = ("name", "labels", "start")
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        _registry.observe(self.name, time.perf_counter() - self.start, self.labels)
+        return False
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+_NULL_TIMER = _NullTimer()
+_registry = MetricsRegistry()
+
+def timer(name, **labels):
+    """Context manager that records its block's wall time in histogram `name`; a no-op when disabled"""
+    if not METRICS_ENABLED:
+        return _NULL_TIMER
+    return _Timer(name, tuple(sorted(labels.items())))
+
+def observe(name, value, **labels):
+    if METRICS_ENABLED:
+        _registry.observe(name, value, tuple(sorted(labels.items())))
+
+def increment(name, amount=1, **labels):
+    if METRICS_ENABLED:
+        _registry.increment(name, amount, tuple(sorted(labels.items())))
+
+def timed(name, **labels):
+    """Decorator form of timer(); returns the function unchanged when metrics are disabled"""
+    def decorate(function):
+        if not METRICS_ENABLED:
+            return function
+        label_items = tuple(sorted(labels.items()))
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                _registry.observe(name, time.perf_counter() - start, label_items)
+        wrapper.__name__ = function.__name__
+        wrapper.__doc__ = function.__doc__
+        wrapper.__wrapped__ = function
+        return wrapper
+    return decorate
+
+def get_metrics_registry():
+    return _registry
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = _registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+_exporter_started = False
+_exporter_lock = threading.Lock()
+
+def start_metrics_exporter(host=METRICS_HOST, port=METRICS_PORT, path=METRICS_FILE, interval=METRICS_FLUSH_INTERVAL):
+    """Serve /metrics on `port` and/or rewrite `path` every `interval` seconds, once per process
+
+    Does nothing unless METRICS_ENABLED=1. Streamlit re-executes app.py on every rerun,
+    so repeated calls after the first are ignored.
+    """
+    global _exporter_started
+    if not METRICS_ENABLED:
+        return
+    with _exporter_lock:
+        if _exporter_started:
+            return
+        _exporter_started = True
+    if port:
+        try:
+            server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        except OSError as e:
+            # Another worker in this host may already be serving the port
+            logger.warning("Metrics endpoint not started on %s:%d: %s", host, port, e)
+        else:
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    if path:
+        threading.Thread(target=_flush_periodically, args=(path, interval), name="metrics-file", daemon=True).start()
+
+def _flush_periodically(path, interval):
+    while True:
+        time.sleep(interval)
+        try:
+            flush_metrics(path)
+        except OSError as e:
+            logger.warning("Could not write metrics to %s: %s", path, e)
+
+def flush_metrics(path=METRICS_FILE):
+    """Atomically write the current metrics to `path` in Prometheus text format"""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(_registry.render())
+    os.replace(temp_path, path)
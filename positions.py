@@ -0,0 +1,139 @@
+import os
+import re
+from functools import lru_cache
+
+import numpy as np
+
+POSITION_MATCH_THRESHOLD = float(os.getenv("POSITION_MATCH_THRESHOLD", "0.75"))
+NGRAM_SIZE = 3
+
+ROLE_TAXONOMY = {
+    "Python Developer": ["python developer", "python engineer", "python programmer", "django developer",
+                         "flask developer", "fastapi developer", "backend engineer python", "python backend developer"],
+    "Java Developer": ["java developer", "java engineer", "spring boot developer", "j2ee developer",
+                       "backend engineer java", "java backend developer"],
+    "JavaScript Developer": ["javascript developer", "js developer", "node developer", "nodejs developer",
+                             "node js engineer", "typescript developer"],
+    "Frontend Developer": ["frontend developer", "front end developer", "frontend engineer", "ui developer",
+                           "react developer", "angular developer", "vue developer", "web developer"],
+    "Backend Developer": ["backend developer", "back end developer", "backend engineer", "server side developer",
+                          "api developer"],
+    "Full Stack Developer": ["full stack developer", "fullstack developer", "full stack engineer", "mern stack developer",
+                             "mean stack developer"],
+    "Go Developer": ["go developer", "golang developer", "golang engineer", "go engineer"],
+    "C++ Developer": ["c++ developer", "cpp developer", "c++ engineer", "c++ programmer",
+                      "embedded c++ developer"],
+    ".NET Developer": [".net developer", "dotnet developer", "c# developer", "asp.net developer"],
+    "Mobile Developer": ["mobile developer", "android developer", "ios developer", "flutter developer",
+                         "react native developer", "kotlin developer", "swift developer"],
+    "Data Engineer": ["data engineer", "big data engineer", "etl developer", "spark engineer", "data pipeline engineer"],
+    "Data Scientist": ["data scientist", "data science", "applied scientist", "statistician"],
+    "Data Analyst": ["data analyst", "business intelligence analyst", "bi analyst", "business analyst",
+                     "reporting analyst", "sql analyst"],
+    "Machine Learning Engineer": ["machine learning engineer", "ml engineer", "ai engineer", "deep learning engineer",
+                                  "mlops engineer", "computer vision engineer", "nlp engineer"],
+    "DevOps Engineer": ["devops engineer", "site reliability engineer", "sre", "platform engineer",
+                        "build and release engineer", "infrastructure engineer"],
+    "Cloud Engineer": ["cloud engineer", "aws engineer", "azure engineer", "gcp engineer", "cloud architect"],
+    "Database Administrator": ["database administrator", "dba", "sql server dba", "oracle dba", "database engineer"],
+    "QA Engineer": ["qa engineer", "quality assurance engineer", "test engineer", "software tester",
+                    "automation tester", "sdet", "test automation engineer"],
+    "Security Engineer": ["security engineer", "cybersecurity analyst", "cyber security engineer",
+                          "penetration tester", "information security analyst", "soc analyst"],
+    "Network Engineer": ["network engineer", "network administrator", "ccna engineer"],
+    "System Administrator": ["system administrator", "systems administrator", "sysadmin", "linux administrator",
+                             "it support engineer"],
+    "Software Engineer": ["software engineer", "software developer", "sde", "programmer", "application developer"],
+    "UI/UX Designer": ["ui ux designer", "ux designer", "ui designer", "product designer", "interaction designer"],
+    "Product Manager": ["product manager", "product owner", "technical product manager"],
+    "Project Manager": ["project manager", "it project manager", "scrum master", "program manager",
+                        "delivery manager"],
+}
+
+# Seniority and filler words do not change which question bank fits a role
+STOP_WORDS = {"senior", "sr", "junior", "jr", "lead", "principal", "staff", "mid", "level", "entry",
+              "associate", "intern", "trainee", "i", "ii", "iii", "iv", "a", "an", "the", "for", "of",
+              "with", "role", "position", "job", "experienced", "remote"}
+
+ABBREVIATIONS = {"dev": "developer", "devs": "developer", "developers": "developer", "eng": "engineer",
+                 "engg": "engineer", "engineers": "engineer", "ml": "machine learning",
+                 "js": "javascript", "fe": "frontend", "be": "backend", "front-end": "frontend",
+                 "back-end": "backend", "fullstack": "full stack", "full-stack": "full stack",
+                 "k8s": "kubernetes", "mgr": "manager", "pm": "product manager", "admin": "administrator"}
+
+def clean_position(position):
+    """Lowercase a position, expand abbreviations and drop seniority/filler words"""
+    words = []
+    for word in re.findall(r"[a-z0-9+#.\-]+", position.lower()):
+        word = word.strip(".-")
+        if not word or word in STOP_WORDS:
+            continue
+        words.append(ABBREVIATIONS.get(word, word))
+    return " ".join(words)
+
+def _ngrams(text):
+    padded = f" {text} "
+    return [padded[i:i + NGRAM_SIZE] for i in range(len(padded) - NGRAM_SIZE + 1)]
+
+class RoleIndex:
+    """Character n-gram TF-IDF index over the role taxonomy, queried by cosine similarity"""
+
+    def __init__(self, taxonomy=ROLE_TAXONOMY):
+        self.roles = []
+        aliases = []
+        for role, role_aliases in taxonomy.items():
+            for alias in [role] + role_aliases:
+                self.roles.append(role)
+                aliases.append(clean_position(alias))
+
+        self.vocabulary = {}
+        for alias in aliases:
+            for gram in _ngrams(alias):
+                self.vocabulary.setdefault(gram, len(self.vocabulary))
+
+        counts = np.zeros((len(aliases), len(self.vocabulary)), dtype=np.float32)
+        for row, alias in enumerate(aliases):
+            for gram in _ngrams(alias):
+                counts[row, self.vocabulary[gram]] += 1
+        document_frequency = np.count_nonzero(counts, axis=0)
+        self.idf = (np.log((1 + len(aliases)) / (1 + document_frequency)) + 1).astype(np.float32)
+        self.matrix = self._normalize(counts * self.idf)
+
+    def vectorize(self, text):
+        vector = np.zeros(len(self.vocabulary), dtype=np.float32)
+        for gram in _ngrams(text):
+            column = self.vocabulary.get(gram)
+            if column is not None:
+                vector[column] += 1
+        return self._normalize(vector * self.idf)
+
+    def match(self, position):
+        """Return (canonical_role, similarity) for the closest taxonomy entry"""
+        text = clean_position(position)
+        if not text:
+            return None, 0.0
+        scores = self.matrix @ self.vectorize(text)
+        best = int(np.argmax(scores))
+        return self.roles[best], float(scores[best])
+
+    @staticmethod
+    def _normalize(values):
+        norms = np.linalg.norm(values, axis=-1, keepdims=True)
+        return values / np.where(norms == 0, 1, norms)
+
+_role_index = None
+
+def get_role_index():
+    """Return the process-wide role index, building it on first use"""
+    global _role_index
+    if _role_index is None:
+        _role_index = RoleIndex()
+    return _role_index
+
+@lru_cache(maxsize=4096)
+def canonical_position(position, threshold=POSITION_MATCH_THRESHOLD):
+    """Map free-text position to its canonical taxonomy role, or return it unchanged below the threshold"""
+    role, score = get_role_index().match(position)
+    if role is not None and score >= threshold:
+        return role
+    return position.strip()
@@ -0,0 +1,120 @@
+"""Pre-generate question banks for a list of positions.
+
+Usage:
+    python prebuild_questions.py "Python Developer" "Data Engineer"
+    python prebuild_questions.py --file open_requisitions.txt --workers 4 --per-minute 30
+    python prebuild_questions.py --reset-saturated "Python Developer"
+
+Each role is generated until its bank is full (QUESTION_BANK_TARGET distinct questions)
+or generations stop adding new ones. Roles whose bank is already full are skipped, so
+an interrupted run can simply be re-run. --reset-saturated gives roles whose generations
+had stopped adding questions another try before their saturation expires on its own.
+"""
+import argparse
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from prompts import configure_llm_client, create_backend
+from questions import MAX_QUESTIONS, load_position_questions
+from positions import canonical_position
+from question_bank import QUESTION_BANK_PATIENCE, get_question_bank, normalize_position
+
+class RateLimiter:
+    """Spaces calls evenly so no more than `per_minute` start in any minute"""
+
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0
+        self._next_slot = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+def read_positions(args):
+    positions = list(args.positions)
+    if args.file:
+        handle = sys.stdin if args.file == "-" else open(args.file, encoding="utf-8")
+        with handle:
+            positions.extend(line.strip() for line in handle)
+    return [p for p in positions if p and not p.startswith("#")]
+
+def unique_roles(positions):
+    """Canonicalize positions and drop ones that share a question bank"""
+    roles = {}
+    for position in positions:
+        role = canonical_position(position)
+        roles.setdefault(normalize_position(role), role)
+    return list(roles.values())
+
+def is_built(role):
+    return get_question_bank().can_draw(role, MAX_QUESTIONS)
+
+def build_bank(role, limiter):
+    """Generate batches for a role until its bank is full or stops growing; returns (size, seconds)
+
+    Batches that bank nothing (no answer keys, or empty) do not saturate the role, so
+    QUESTION_BANK_PATIENCE of them in a row end the build too.
+    """
+    bank = get_question_bank()
+    start = time.perf_counter()
+    stalled = 0
+    while not is_built(role) and not bank.saturated(role) and stalled < QUESTION_BANK_PATIENCE:
+        limiter.acquire()
+        size = bank.size(role)
+        load_position_questions(role)
+        stalled = stalled + 1 if bank.size(role) == size else 0
+    return bank.size(role), time.perf_counter() - start
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-generate per-role question banks.")
+    parser.add_argument("positions", nargs="*", help="positions to build banks for")
+    parser.add_argument("--file", help="file with one position per line ('-' for stdin)")
+    parser.add_argument("--workers", type=int, default=4, help="concurrent generations (default: 4)")
+    parser.add_argument("--per-minute", type=float, default=30, help="max generations started per minute (default: 30)")
+    parser.add_argument("--reset-saturated", action="store_true",
+                        help="generate again for roles whose banks had stopped growing")
+    args = parser.parse_args(argv)
+
+    roles = unique_roles(read_positions(args))
+    if not roles:
+        parser.error("no positions given")
+    if args.reset_saturated:
+        for role in roles:
+            get_question_bank().reset_saturation(role)
+
+    pending = [role for role in roles if not is_built(role)]
+    print(f"{len(roles)} roles, {len(roles) - len(pending)} already built, {len(pending)} to build")
+
+    if pending:
+        # --per-minute counts generations; a hedged duplicate would be a request it never saw
+        configure_llm_client(create_backend(), hedge_after=0)
+    limiter = RateLimiter(args.per_minute)
+    failed = []
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        futures = {executor.submit(build_bank, role, limiter): role for role in pending}
+        for done, future in enumerate(as_completed(futures), 1):
+            role = futures[future]
+            try:
+                count, elapsed = future.result()
+            except Exception as e:
+                count, elapsed = 0, 0.0
+                print(f"[{done}/{len(pending)}] {role}: error: {e}")
+            else:
+                print(f"[{done}/{len(pending)}] {role}: {count} questions in {elapsed:.1f}s")
+            if not is_built(role):
+                failed.append(role)
+
+    if failed:
+        print(f"{len(failed)} roles failed: {', '.join(failed)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+import cProfile
+import hmac
+import io
+import logging
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# "off", "rerun" (every app rerun) or "turn" (every generate_response call)
+PROFILE_MODE = os.getenv("PROFILE_MODE", "off")
+# Reruns of a page opened with ?profile=<PROFILE_TOKEN> are profiled; unset disables the parameter
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+PROFILE_REPORT_LINES = 40
+
+# cProfile hooks the calling thread only; one capture at a time keeps profiles of concurrent turns apart
+_profile_lock = threading.Lock()
+
+def profile_requested(token):
+    """Whether an admin-supplied ?profile= value matches PROFILE_TOKEN"""
+    return bool(PROFILE_TOKEN and token) and hmac.compare_digest(token, PROFILE_TOKEN)
+
+@contextmanager
+def profiled(label, enabled=True, session_id=None, directory=PROFILE_DIR):
+    """Profile the block with cProfile and write `<time>-<session>-<label>.prof` plus a text report
+
+    Skipped if `enabled` is false or another capture is running. Only the newest
+    PROFILE_KEEP captures are kept in `directory`.
+    """
+    if not enabled or not _profile_lock.acquire(blocking=False):
+        yield None
+        return
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        _profile_lock.release()
+        try:
+            path = write_profile(profiler, label, session_id, time.perf_counter() - started, directory)
+            logger.info("Wrote profile %s", path)
+        except OSError as e:
+            logger.warning("Could not write profile for %s: %s", label, e)
+
+def write_profile(profiler, label, session_id, elapsed, directory=PROFILE_DIR):
+    os.makedirs(directory, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S") + f"-{int(time.time() * 1000) % 1000:03d}"
+    base = os.path.join(directory, f"{stamp}-{(session_id or 'nosession')[:8]}-{label}")
+    profiler.dump_stats(base + ".prof")
+
+    report = io.StringIO()
+    report.write(f"{label} took {elapsed * 1000:.1f} ms (session {session_id or '-'})\n\n")
+    stats = pstats.Stats(profiler, stream=report)
+    stats.sort_stats("cumulative").print_stats(PROFILE_REPORT_LINES)
+    with open(base + ".txt", "w", encoding="utf-8") as f:
+        f.write(report.getvalue())
+
+    rotate_profiles(directory)
+    return base + ".prof"
+
+def rotate_profiles(directory=PROFILE_DIR, keep=PROFILE_KEEP):
+    """Delete all but the newest `keep` captures (a .prof and its .txt count as one)"""
+    captures = sorted(name[:-len(".prof")] for name in os.listdir(directory) if name.endswith(".prof"))
+    for base in captures[:max(0, len(captures) - keep)]:
+        for extension in (".prof", ".txt"):
+            try:
+                os.remove(os.path.join(directory, base + extension))
+            except FileNotFoundError:
+                pass
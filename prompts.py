@@ -1,5 +1,35 @@
+import hashlib
+import json
+import logging
 import os
-import google.generativeai as genai
+import random
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from metrics import increment, observe, timed, timer
+from question_jobs import QUESTION_WAIT_BUDGET
+
+logger = logging.getLogger(__name__)
+
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+LLM_MODEL = os.getenv("LLM_MODEL", "gemini-2.0-flash")
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "8"))
+# A stream with no first chunk after this many seconds gets a duplicate request; 0 disables hedging.
+# "auto" waits for the p95 of recent times to first chunk, at least LLM_HEDGE_MIN_DELAY and at most
+# half the consent turn's wait budget, so the duplicate can still answer within it
+LLM_HEDGE_AFTER = os.getenv("LLM_HEDGE_AFTER", "auto")
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "1"))
+LLM_HEDGE_WORKERS = int(os.getenv("LLM_HEDGE_WORKERS", "16"))
+# Times to first chunk kept for the "auto" delay, and how many are needed before their p95 is used
+LLM_HEDGE_WINDOW = int(os.getenv("LLM_HEDGE_WINDOW", "200"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+
+_hedge_executor = ThreadPoolExecutor(max_workers=LLM_HEDGE_WORKERS, thread_name_prefix="llm-hedge")
 
 def get_system_prompt():
     """Returns the system prompt that defines the chatbot's behavior"""
@@ -25,16 +55,322 @@ def get_system_prompt():
     - If unsure how to respond, say "I'm not sure I understand. Could you rephrase that?"
     """
 
-def generate_tech_questions(position=None):
-    """Generate technical questions using Google's Generative AI API"""
-    if not position:
-        return "Error: Position is required to generate relevant technical questions."
-    
-    try:
-        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-        model = genai.GenerativeModel('gemini-2.0-flash')
+class LLMBackend:
+    """Interface for the text generation backends behind LLMClient"""
+
+    retryable_errors = (TimeoutError, ConnectionError)
+
+    def generate(self, prompt, timeout, response_schema=None):
+        """Return the full response text for a prompt, as JSON matching response_schema if given"""
+        raise NotImplementedError
+
+    def stream(self, prompt, timeout, response_schema=None):
+        """Yield the response text in chunks as it is produced, as JSON matching response_schema if given"""
+        raise NotImplementedError
+
+    @staticmethod
+    def record_usage(prompt_tokens, completion_tokens):
+        increment("llm_tokens_total", prompt_tokens or 0, kind="prompt")
+        increment("llm_tokens_total", completion_tokens or 0, kind="completion")
+
+class GeminiBackend(LLMBackend):
+    """Google Gemini backend; one configured model instance shares the SDK's pooled channel
+
+    The SDK takes over a second to import, so it is loaded here on first construction
+    rather than when this module is imported.
+    """
+
+    def __init__(self, model_name=LLM_MODEL, api_key=None):
+        import google.generativeai as genai
+        from google.api_core import exceptions as google_exceptions
+
+        self.retryable_errors = LLMBackend.retryable_errors + (
+            google_exceptions.DeadlineExceeded,
+            google_exceptions.InternalServerError,
+            google_exceptions.ResourceExhausted,
+            google_exceptions.ServiceUnavailable,
+        )
+        genai.configure(api_key=api_key or os.getenv("GOOGLE_API_KEY"))
+        self.model = genai.GenerativeModel(model_name)
+
+    def generate(self, prompt, timeout, response_schema=None):
+        response = self.model.generate_content(
+            prompt, generation_config=self._generation_config(response_schema), request_options={"timeout": timeout}
+        )
+        self._record_response_usage(response)
+        return response.text
+
+    def stream(self, prompt, timeout, response_schema=None):
+        response = self.model.generate_content(
+            prompt, generation_config=self._generation_config(response_schema), stream=True,
+            request_options={"timeout": timeout}
+        )
+        chunk = None
+        for chunk in response:
+            yield chunk.text
+        # Streamed chunks carry running totals, so the last one has the whole call's usage
+        if chunk is not None:
+            self._record_response_usage(chunk)
+
+    @staticmethod
+    def _generation_config(response_schema):
+        if response_schema is None:
+            return None
+        return {"response_mime_type": "application/json", "response_schema": response_schema}
+
+    def _record_response_usage(self, response):
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None:
+            self.record_usage(usage.prompt_token_count, usage.candidates_token_count)
+
+class StubBackend(LLMBackend):
+    """Deterministic offline backend for tests and benchmarks
+
+    Responses are derived from a hash of the prompt. `latency` is simulated per call and
+    `failure_rate` makes that fraction of calls raise a retryable ConnectionError, chosen
+    by a seeded generator so runs are reproducible.
+    """
+
+    def __init__(self, latency=0.0, failure_rate=0.0, seed=0, chunk_size=64):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.chunk_size = chunk_size
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def generate(self, prompt, timeout, response_schema=None):
+        self._begin_call(timeout)
+        time.sleep(self.latency)
+        text = self.render_json(prompt) if response_schema is not None else self.render(prompt)
+        self.record_usage(len(prompt) // 4, len(text) // 4)
+        return text
+
+    def stream(self, prompt, timeout, response_schema=None):
+        self._begin_call(timeout)
+        text = self.render_json(prompt) if response_schema is not None else self.render(prompt)
+        chunks = [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)]
+        for chunk in chunks:
+            time.sleep(self.latency / len(chunks))
+            yield chunk
+        self.record_usage(len(prompt) // 4, len(text) // 4)
+
+    def render(self, prompt):
+        """Return the deterministic MCQ text for a prompt"""
+        lines = []
+        for i, question in enumerate(self._questions(prompt), 1):
+            lines.append(f"{i}. {question['question']}")
+            for letter, option in zip("ABCD", question["options"]):
+                lines.append(f"   - {letter}) {option}")
+            lines.append("")
+        return "\n".join(lines)
+
+    def render_json(self, prompt):
+        """Return the deterministic MCQs for a prompt as schema-shaped JSON"""
+        return json.dumps(self._questions(prompt))
+
+    def _questions(self, prompt):
+        digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:8]
+        match = re.search(r"Generate (\d+)", prompt)
+        count = int(match.group(1)) if match else 15
+        return [
+            {
+                # The hashed tail keeps questions distinct enough to pass question bank deduplication
+                "question": f"Stub question {i} ({digest}) {hashlib.sha1(f'{digest}-{i}'.encode()).hexdigest()[:24]}?",
+                "options": [f"Option {letter} for question {i}" for letter in "ABCD"],
+                "correct_answer": "ABCD"[(int(digest, 16) + i) % 4],
+                "difficulty": (i - 1) % 5 + 1,
+            }
+            for i in range(1, count + 1)
+        ]
+
+    def _begin_call(self, timeout):
+        with self._lock:
+            self.calls += 1
+            failed = self._random.random() < self.failure_rate
+        if self.latency > timeout:
+            time.sleep(timeout)
+            raise TimeoutError("Stub backend exceeded the call deadline")
+        if failed:
+            raise ConnectionError("Stub backend injected failure")
+
+class LLMClient:
+    """Process-wide LLM client with per-call deadlines, jittered exponential backoff and hedging
+
+    A stream with no first chunk after the hedge delay gets a second identical request,
+    and whichever starts answering first is used. This cuts the upstream tail at the cost
+    of a duplicate request for the slowest streams. `hedge_after` is the delay in seconds
+    (0 disables hedging) or "auto" for the p95 of recent times to first chunk, kept
+    between `hedge_min` and `hedge_max`. Whole-response generate() calls are not hedged: they routinely take
+    longer than any useful delay, so a duplicate would mostly double the load.
+    """
+
+    def __init__(self, backend, timeout=LLM_TIMEOUT, max_retries=LLM_MAX_RETRIES,
+                 backoff_base=LLM_BACKOFF_BASE, backoff_max=LLM_BACKOFF_MAX, hedge_after=LLM_HEDGE_AFTER,
+                 hedge_min=LLM_HEDGE_MIN_DELAY, hedge_max=QUESTION_WAIT_BUDGET / 2):
+        self.backend = backend
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_after = hedge_after if hedge_after == "auto" else float(hedge_after)
+        self.hedge_min = hedge_min
+        self.hedge_max = hedge_max
+        self._first_chunk_seconds = deque(maxlen=LLM_HEDGE_WINDOW)
+        self._stats = {"calls": 0, "hedged": 0, "hedge_won": 0}
+        self._stats_lock = threading.Lock()
+
+    def generate(self, prompt, timeout=None, response_schema=None):
+        """Return the response text, retrying transient errors until the call deadline"""
+        deadline = time.monotonic() + (timeout or self.timeout)
+        self._count("calls")
+        return self._generate(prompt, deadline, response_schema)
+
+    def stream(self, prompt, timeout=None, response_schema=None):
+        """Yield response chunks; transient errors are retried only before the first chunk"""
+        deadline = time.monotonic() + (timeout or self.timeout)
+        first, chunks = self._hedged(lambda: self._open_stream(prompt, deadline, response_schema), deadline)
+        if first is not None:
+            yield first
+            yield from chunks
+
+    def hedge_delay(self):
+        """Seconds to wait for a stream's first chunk before hedging it; 0 means never"""
+        if self.hedge_after != "auto":
+            return self.hedge_after
+        with self._stats_lock:
+            samples = sorted(self._first_chunk_seconds)
+        if len(samples) < LLM_HEDGE_MIN_SAMPLES:
+            return self.hedge_max
+        return min(max(samples[int(0.95 * (len(samples) - 1))], self.hedge_min), self.hedge_max)
+
+    def stats(self):
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def _count(self, name):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def _hedged(self, call, deadline):
+        """Run `call`, starting a duplicate if it is still running after the hedge delay"""
+        self._count("calls")
+        delay = self.hedge_delay()
+        if not delay or delay >= deadline - time.monotonic():
+            return call()
+        primary = _hedge_executor.submit(call)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
         
-        prompt = f"""
+        self._count("hedged")
+        increment("llm_hedged_requests_total")
+        logger.warning("LLM stream had no first chunk after %.1fs, sending a hedged request", delay)
+        hedge = _hedge_executor.submit(call)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, timeout=max(0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self._count("hedge_won")
+                        increment("llm_hedge_wins_total")
+                    for loser in pending:
+                        loser.add_done_callback(_close_stream)
+                    return future.result()
+                error = future.exception()
+        raise error or TimeoutError("LLM call deadline exceeded")
+
+    def _generate(self, prompt, deadline, response_schema):
+        attempt = 0
+        while True:
+            try:
+                return self.backend.generate(prompt, self._remaining(deadline), response_schema)
+            except self.backend.retryable_errors as e:
+                attempt += 1
+                self._backoff(attempt, deadline, e)
+
+    def _open_stream(self, prompt, deadline, response_schema):
+        """Start a stream and wait for its first chunk; returns (first_chunk, rest) with first_chunk None if empty
+
+        Each request's own time to first chunk is recorded, hedged or not, so the "auto"
+        delay follows the backend rather than the shorter latency hedging produces.
+        """
+        started = time.monotonic()
+        chunks = self._stream(prompt, deadline, response_schema)
+        first = next(chunks, None)
+        with self._stats_lock:
+            self._first_chunk_seconds.append(time.monotonic() - started)
+        return first, chunks
+
+    def _stream(self, prompt, deadline, response_schema):
+        attempt = 0
+        while True:
+            started = False
+            try:
+                for chunk in self.backend.stream(prompt, self._remaining(deadline), response_schema):
+                    started = True
+                    yield chunk
+                return
+            except self.backend.retryable_errors as e:
+                if started:
+                    raise
+                attempt += 1
+                self._backoff(attempt, deadline, e)
+
+    def _remaining(self, deadline):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError("LLM call deadline exceeded")
+        return remaining
+
+    def _backoff(self, attempt, deadline, error):
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+        if attempt > self.max_retries or time.monotonic() + delay >= deadline:
+            raise error
+        logger.warning("Retrying LLM call (attempt %d) after %.2fs: %s", attempt, delay, error)
+        time.sleep(delay)
+
+def _close_stream(future):
+    # Losing hedged streams are closed as soon as they produce their first chunk
+    if future.exception() is None and isinstance(future.result(), tuple):
+        future.result()[1].close()
+
+def create_backend(name=LLM_BACKEND):
+    """Build the backend named by LLM_BACKEND ('gemini' or 'stub')"""
+    if name == "stub":
+        return StubBackend(
+            latency=float(os.getenv("LLM_STUB_LATENCY", "0")),
+            failure_rate=float(os.getenv("LLM_STUB_FAILURE_RATE", "0")),
+        )
+    if name == "gemini":
+        return GeminiBackend()
+    raise ValueError(f"Unknown LLM backend: {name}")
+
+_llm_client = None
+_llm_client_lock = threading.Lock()
+
+def get_llm_client():
+    """Return the process-wide LLM client, configuring it on first use"""
+    global _llm_client
+    if _llm_client is None:
+        with _llm_client_lock:
+            if _llm_client is None:
+                _llm_client = LLMClient(create_backend())
+    return _llm_client
+
+def configure_llm_client(backend, **options):
+    """Replace the process-wide LLM client, e.g. with a StubBackend for tests and benchmarks"""
+    global _llm_client
+    with _llm_client_lock:
+        _llm_client = LLMClient(backend, **options)
+    return _llm_client
+
+def build_questions_prompt(position):
+    return f"""
         Generate 15 technical multiple-choice questions specifically for a '{position}' position.
         Each question should have 4 options (A, B, C, D) with only one correct answer.
         Questions should assess core competencies, practical knowledge, and problem-solving abilities 
@@ -50,8 +386,235 @@ def generate_tech_questions(position=None):
 
         Please provide only the questions and options, no additional commentary or explanation.
         """
-        
-        response = model.generate_content(prompt)
-        return response.text
+
+QUESTION_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "question": {"type": "string"},
+            "options": {"type": "array", "items": {"type": "string"}},
+            "correct_answer": {"type": "string", "format": "enum", "enum": ["A", "B", "C", "D"]},
+            "difficulty": {"type": "integer"},
+        },
+        "required": ["question", "options", "correct_answer"],
+    },
+}
+
+def build_structured_questions_prompt(position, repair=None):
+    prompt = f"""
+        Generate 15 technical multiple-choice questions specifically for a '{position}' position.
+        Questions should assess core competencies, practical knowledge, and problem-solving abilities 
+        required for the '{position}' role.
+
+        Return a JSON array with one object per question. Each object has:
+        - "question": the question text
+        - "options": exactly 4 answer options, in order A, B, C, D, without letter prefixes
+        - "correct_answer": the letter of the single correct option ("A", "B", "C" or "D")
+        - "difficulty": 1 (entry level) to 5 (expert), spread evenly across the questions
+        """
+    if repair:
+        previous_text, errors = repair
+        prompt += f"""
+        Your previous response did not match this format:
+        {"; ".join(errors[:5])}
+
+        Previous response:
+        {previous_text[:4000]}
+
+        Return the complete corrected JSON array.
+        """
+    return prompt
+
+class QuestionGenerationError(Exception):
+    """The LLM produced no response to a question generation request"""
+
+def generate_tech_questions(position=None, stream=False, structured=False, repair=None):
+    """Generate technical questions through the shared LLM client
+
+    With stream=True an iterator over the response text chunks is returned instead,
+    so callers can start parsing questions before the whole response has arrived.
+    With structured=True the model is constrained to QUESTION_SCHEMA and returns a JSON
+    array with answer keys; `repair` is a (previous_text, errors) pair to correct.
+    Raises QuestionGenerationError if the call fails (for streams, while iterating).
+    """
+    if not position:
+        raise QuestionGenerationError("Position is required to generate relevant technical questions")
+    
+    try:
+        client = get_llm_client()
+        if structured:
+            prompt = build_structured_questions_prompt(position, repair)
+            if stream:
+                return _stream_text(client.stream(prompt, response_schema=QUESTION_SCHEMA))
+            with timer("llm_seconds", mode="structured"):
+                return client.generate(prompt, response_schema=QUESTION_SCHEMA)
+        prompt = build_questions_prompt(position)
+        if stream:
+            return _stream_text(client.stream(prompt))
+        with timer("llm_seconds", mode="text"):
+            return client.generate(prompt)
+    except Exception as e:
+        increment("llm_errors_total")
+        logger.warning("Question generation failed for %r: %s", position, e)
+        raise QuestionGenerationError(f"Error generating technical questions: {e}") from e
+
+@timed("parse_seconds", format="json")
+def parse_structured_mcqs(questions_text):
+    """Validate schema-constrained JSON questions in one pass, returning (questions, errors)"""
+    try:
+        items = json.loads(questions_text)
+    except ValueError as e:
+        return [], [f"invalid JSON: {e}"]
+    if isinstance(items, dict):
+        items = items.get("questions")
+    if not isinstance(items, list):
+        return [], ["expected a JSON array of questions"]
+    
+    questions = []
+    errors = []
+    for i, item in enumerate(items, 1):
+        question, error = _validate_structured_question(item, i)
+        if error:
+            errors.append(error)
+        else:
+            questions.append(question)
+    increment("questions_parsed_total", len(questions), format="json")
+    increment("questions_dropped_total", len(errors), format="json")
+    return questions, errors
+
+def _validate_structured_question(item, i):
+    """Return (question, None) for a valid schema object, else (None, error)"""
+    if not isinstance(item, dict):
+        return None, f"question {i} is not an object"
+    question = item.get("question")
+    options = item.get("options")
+    answer = item.get("correct_answer")
+    if not isinstance(question, str) or not question.strip():
+        return None, f"question {i} has no question text"
+    if not isinstance(options, list) or len(options) != 4 or not all(isinstance(o, str) and o.strip() for o in options):
+        return None, f"question {i} must have exactly 4 non-empty options"
+    if not isinstance(answer, str) or answer.strip().upper()[:1] not in ("A", "B", "C", "D"):
+        return None, f"question {i} has no correct_answer in A-D"
+    parsed = {
+        'question': question.strip(),
+        'options': [o.strip() for o in options],
+        'correct_answer': answer.strip().upper()[:1]
+    }
+    # Optional; adaptive assessments treat unrated questions as medium difficulty
+    difficulty = item.get("difficulty")
+    if isinstance(difficulty, int) and 1 <= difficulty <= 5:
+        parsed['difficulty'] = difficulty
+    return parsed, None
+
+def iter_json_items(chunks):
+    """Yield each element of a streamed JSON array as soon as it is complete
+
+    The array may be wrapped in an object, as in {"questions": [...]}. Raises ValueError
+    at the end of the stream if the array never closed, e.g. after an undecodable element.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = None
+    closer = None
+    for chunk in chunks:
+        buffer += chunk
+        if position is None:
+            start = buffer.find("[")
+            if start < 0:
+                continue
+            position = start + 1
+        elif closer and closer not in chunk:
+            # The object or array cut off last time cannot have been completed by this chunk
+            continue
+        closer = None
+        while True:
+            while position < len(buffer) and buffer[position] in ", \t\r\n":
+                position += 1
+            if position >= len(buffer) or buffer[position] == "]":
+                break
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except ValueError:
+                # Most likely an element cut off mid-chunk; retried once more text arrives
+                closer = {"{": "}", "[": "]"}.get(buffer[position])
+                break
+            yield item
+        buffer, position = buffer[position:], 0
+    if position is None or not buffer.startswith("]"):
+        raise ValueError("response ended before its JSON array was complete")
+
+def generate_structured_questions(position):
+    """Generate answer-keyed questions as JSON, with a single repair attempt if validation fails
+
+    Only a response that arrived but failed validation is repaired; a failed call raises
+    QuestionGenerationError straight away rather than spending a second one.
+    """
+    text = generate_tech_questions(position, structured=True)
+    questions, errors = parse_structured_mcqs(text)
+    if errors:
+        logger.warning("Structured questions for %r failed validation: %s", position, "; ".join(errors[:5]))
+        try:
+            repaired, _ = parse_structured_mcqs(
+                generate_tech_questions(position, structured=True, repair=(text, errors))
+            )
+        except QuestionGenerationError:
+            repaired = []
+        if len(repaired) > len(questions):
+            questions = repaired
+    return questions
+
+def stream_structured_questions(position):
+    """Yield answer-keyed questions as each object in the streamed JSON response completes
+
+    Invalid questions are dropped as they arrive. If any were, or the JSON broke off,
+    the whole response gets the single repair attempt generate_structured_questions
+    makes, and repaired questions not already yielded follow.
+    """
+    chunks = []
+    yielded = set()
+    errors = []
+
+    def recorded(stream):
+        for chunk in stream:
+            chunks.append(chunk)
+            yield chunk
+
+    try:
+        items = iter_json_items(recorded(generate_tech_questions(position, stream=True, structured=True)))
+        for i, item in enumerate(items, 1):
+            question, error = _validate_structured_question(item, i)
+            if error:
+                errors.append(error)
+                increment("questions_dropped_total", format="json")
+                continue
+            yielded.add(question['question'])
+            increment("questions_parsed_total", format="json")
+            yield question
+    except ValueError as e:
+        errors.append(f"invalid JSON: {e}")
+    if not errors:
+        return
+
+    logger.warning("Structured questions for %r failed validation: %s", position, "; ".join(errors[:5]))
+    try:
+        repaired, _ = parse_structured_mcqs(
+            generate_tech_questions(position, structured=True, repair=("".join(chunks), errors))
+        )
+    except QuestionGenerationError:
+        repaired = []
+    for question in repaired:
+        if question['question'] not in yielded:
+            yielded.add(question['question'])
+            yield question
+
+def _stream_text(chunks):
+    started = time.perf_counter()
+    try:
+        yield from chunks
     except Exception as e:
-        return f"Error generating technical questions: {str(e)}"
\ No newline at end of file
+        increment("llm_errors_total")
+        logger.warning("Question stream failed: %s", e)
+        raise QuestionGenerationError(f"Error generating technical questions: {e}") from e
+    finally:
+        observe("llm_seconds", time.perf_counter() - started, mode="stream")
@@ -0,0 +1,366 @@
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+
+QUESTION_BANK_DB = os.getenv("QUESTION_BANK_DB", "question_bank.db")
+# A role with this many distinct questions is served from its bank without calling the LLM
+QUESTION_BANK_TARGET = int(os.getenv("QUESTION_BANK_TARGET", "60"))
+# Generations of mostly duplicates adding fewer new questions than this count as low-yield; after
+# QUESTION_BANK_PATIENCE of them in a row the bank is served as it is, for QUESTION_BANK_SATURATION_TTL
+# seconds before generation is tried again
+QUESTION_BANK_MIN_NEW = int(os.getenv("QUESTION_BANK_MIN_NEW", "3"))
+QUESTION_BANK_PATIENCE = int(os.getenv("QUESTION_BANK_PATIENCE", "3"))
+QUESTION_BANK_SATURATION_TTL = int(os.getenv("QUESTION_BANK_SATURATION_TTL", str(24 * 3600)))
+QUESTION_BANK_MEMORY_ROLES = int(os.getenv("QUESTION_BANK_MEMORY_ROLES", "256"))
+# Banked questions expire after QUESTION_BANK_TTL seconds; past QUESTION_BANK_DISK_ROLES roles the least
+# recently used are dropped. A role stops generating at QUESTION_BANK_TARGET, which bounds each bank's size
+QUESTION_BANK_TTL = int(os.getenv("QUESTION_BANK_TTL", str(7 * 24 * 3600)))
+QUESTION_BANK_DISK_ROLES = int(os.getenv("QUESTION_BANK_DISK_ROLES", "5000"))
+# Estimated Jaccard similarity of character shingles above which two questions are the same question
+DUPLICATE_THRESHOLD = float(os.getenv("QUESTION_DUPLICATE_THRESHOLD", "0.6"))
+
+SHINGLE_SIZE = 4
+# 20 bands of 3 rows: pairs at the threshold share a band over 99% of the time, pairs at 0.3 about 40%
+LSH_BANDS = 20
+LSH_ROWS = 3
+MINHASH_PRIME = (1 << 31) - 1
+ANSWER_LETTERS = ("A", "B", "C", "D")
+_seeds = random.Random(20240601)
+MINHASH_PERMUTATIONS = tuple(
+    (_seeds.randrange(1, MINHASH_PRIME), _seeds.randrange(MINHASH_PRIME)) for _ in range(LSH_BANDS * LSH_ROWS)
+)
+_permutation_arrays = None
+
+def normalize_position(position):
+    """Normalize a free-text position into a bank key"""
+    if not position:
+        return ""
+    return " ".join(re.findall(r"[a-z0-9+#]+", position.lower()))
+
+def has_answer_key(question):
+    return question.get('correct_answer') in ANSWER_LETTERS
+
+def copy_questions(questions):
+    """Copy a question list so callers can mutate it without touching the bank"""
+    return [dict(q, options=list(q['options'])) for q in questions]
+
+def shingles(text):
+    """Hashes of the overlapping character n-grams of a question's normalized text"""
+    text = " ".join(re.findall(r"[a-z0-9+#]+", text.lower()))
+    if len(text) <= SHINGLE_SIZE:
+        text = text.ljust(SHINGLE_SIZE)
+    return {
+        int.from_bytes(hashlib.blake2b(text[i:i + SHINGLE_SIZE].encode("utf-8"), digest_size=4).digest(), "little")
+        for i in range(len(text) - SHINGLE_SIZE + 1)
+    }
+
+def minhash(text):
+    """MinHash signature of a question's shingles, one 32-bit value per permutation"""
+    # numpy is imported on first use, which comes after generation, to keep it off the app's startup path
+    import numpy as np
+    global _permutation_arrays
+    if _permutation_arrays is None:
+        _permutation_arrays = tuple(np.array(column, dtype=np.uint64)[:, None] for column in zip(*MINHASH_PERMUTATIONS))
+    multipliers, offsets = _permutation_arrays
+    # a < 2**31 and h < 2**32, so a * h + b cannot overflow 64 bits
+    hashes = np.fromiter(shingles(text), dtype=np.uint64)
+    values = ((multipliers * hashes + offsets) % MINHASH_PRIME).min(axis=1)
+    return array("I", values.astype(np.uint32).tobytes())
+
+def similarity(signature, other):
+    """Estimated Jaccard similarity of the shingle sets behind two signatures"""
+    return sum(1 for x, y in zip(signature, other) if x == y) / len(signature)
+
+class RoleBank:
+    """Distinct questions for one role, with an LSH index for near-duplicates and a shuffled deck for draws"""
+
+    def __init__(self):
+        self.questions = []
+        self.signatures = []
+        # When each question was banked, in ascending order
+        self.added_at = []
+        self.buckets = {}
+        self.low_yield = 0
+        self.saturated_at = None
+        self.accessed_at = 0.0
+        # Question ids in random order; draws take the next ids after `cursor`
+        self.deck = []
+        self.cursor = 0
+
+    def __len__(self):
+        return len(self.questions)
+
+    def find_duplicate(self, signature):
+        """Id of a stored question at least DUPLICATE_THRESHOLD similar to `signature`, or None"""
+        checked = set()
+        for band in self._bands(signature):
+            for question_id in self.buckets.get(band, ()):
+                if question_id in checked:
+                    continue
+                checked.add(question_id)
+                if similarity(signature, self.signatures[question_id]) >= DUPLICATE_THRESHOLD:
+                    return question_id
+        return None
+
+    def add(self, question, signature, added_at):
+        question_id = len(self.questions)
+        self.questions.append(question)
+        self.signatures.append(signature)
+        self.added_at.append(added_at)
+        for band in self._bands(signature):
+            self.buckets.setdefault(band, []).append(question_id)
+        # Shuffle the newcomer into the part of the deck not yet dealt
+        self.deck.append(question_id)
+        swap = random.randrange(self.cursor, len(self.deck))
+        self.deck[swap], self.deck[-1] = self.deck[-1], self.deck[swap]
+
+    def expired(self, cutoff):
+        """Number of questions banked at or before `cutoff`; they are the first ones"""
+        return bisect_right(self.added_at, cutoff)
+
+    def without_first(self, count):
+        """A copy of this bank minus its first `count` questions, re-indexed and reshuffled"""
+        bank = RoleBank()
+        for question, signature, added_at in zip(self.questions[count:], self.signatures[count:], self.added_at[count:]):
+            bank.add(question, signature, added_at)
+        bank.low_yield, bank.saturated_at, bank.accessed_at = self.low_yield, self.saturated_at, self.accessed_at
+        return bank
+
+    def draw(self, count):
+        """`count` distinct questions, none dealt again until the rest of the deck has been"""
+        count = min(count, len(self.deck))
+        if self.cursor + count > len(self.deck):
+            random.shuffle(self.deck)
+            self.cursor = 0
+        ids = self.deck[self.cursor:self.cursor + count]
+        self.cursor += count
+        return [self.questions[question_id] for question_id in ids]
+
+    def _bands(self, signature):
+        for band in range(LSH_BANDS):
+            yield (band, tuple(signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]))
+
+class QuestionBank:
+    """Per-role banks of distinct generated questions, persisted in SQLite
+
+    Each generation's questions are added minus near-duplicates of ones already banked.
+    Once a role has QUESTION_BANK_TARGET questions, or its generations stop adding new
+    ones, candidates are dealt randomized sets from the bank instead of calling the LLM.
+    Questions older than the TTL are dropped, as are the least recently used roles beyond
+    `disk_roles`, so the store stays bounded.
+    """
+
+    def __init__(self, db_path=QUESTION_BANK_DB, target=QUESTION_BANK_TARGET, memory_roles=QUESTION_BANK_MEMORY_ROLES,
+                 saturation_ttl=QUESTION_BANK_SATURATION_TTL, ttl=QUESTION_BANK_TTL, disk_roles=QUESTION_BANK_DISK_ROLES):
+        self.target = target
+        self.memory_roles = memory_roles
+        self.saturation_ttl = saturation_ttl
+        self.ttl = ttl
+        self.disk_roles = disk_roles
+        self._roles = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS bank_questions ("
+                "key TEXT NOT NULL, question TEXT NOT NULL, signature BLOB NOT NULL, added_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS bank_questions_key ON bank_questions (key)")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS bank_roles ("
+                "key TEXT PRIMARY KEY, low_yield INTEGER NOT NULL, saturated_at REAL, accessed_at REAL NOT NULL DEFAULT 0)"
+            )
+            # Banks created before these columns existed get them here; their saturation is treated as expired
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(bank_roles)")}
+            if "saturated_at" not in columns:
+                self._db.execute("ALTER TABLE bank_roles ADD COLUMN saturated_at REAL")
+            if "accessed_at" not in columns:
+                self._db.execute("ALTER TABLE bank_roles ADD COLUMN accessed_at REAL NOT NULL DEFAULT 0")
+            self._evict_disk(time.time())
+            self._db.commit()
+
+    def add(self, position, questions):
+        """Bank the questions that are not near-duplicates of banked ones; returns how many were added
+
+        Questions without an answer key are never banked, so fallback or broken output is
+        not served to later candidates. Only a batch of at least QUESTION_BANK_MIN_NEW keyed
+        questions, most of them duplicates, counts towards saturation: a short or empty
+        batch says nothing about the bank.
+        """
+        key = normalize_position(position)
+        questions = [question for question in questions if has_answer_key(question)]
+        if not key or not questions:
+            return 0
+        # Signatures are computed outside the lock; they only depend on the question text
+        signed = [(question, minhash(question['question'])) for question in copy_questions(questions)]
+        now = time.time()
+        added = []
+        with self._lock:
+            bank = self._role(key)
+            for question, signature in signed:
+                if bank.find_duplicate(signature) is None:
+                    bank.add(question, signature, now)
+                    added.append((key, json.dumps(question), signature.tobytes(), now))
+            duplicates = len(signed) - len(added)
+            if len(signed) >= QUESTION_BANK_MIN_NEW and len(added) < QUESTION_BANK_MIN_NEW and duplicates > len(added):
+                bank.low_yield += 1
+                if bank.low_yield >= QUESTION_BANK_PATIENCE and bank.saturated_at is None:
+                    bank.saturated_at = now
+            elif len(added) >= QUESTION_BANK_MIN_NEW:
+                bank.low_yield = 0
+                bank.saturated_at = None
+            if self._db is not None:
+                self._db.executemany(
+                    "INSERT INTO bank_questions (key, question, signature, added_at) VALUES (?, ?, ?, ?)", added
+                )
+                bank.accessed_at = now
+                self._save_role(key, bank)
+                self._evict_disk(now)
+                self._db.commit()
+        return len(added)
+
+    def size(self, position):
+        with self._lock:
+            return len(self._role(normalize_position(position)))
+
+    def can_draw(self, position, count):
+        """Whether `count` questions for the position should come from the bank rather than the LLM"""
+        with self._lock:
+            key = normalize_position(position)
+            bank = self._role(key)
+            return len(bank) >= count and (len(bank) >= self.target or self._saturated(key, bank))
+
+    def saturated(self, position):
+        """Whether recent generations for the position have stopped adding new questions"""
+        with self._lock:
+            key = normalize_position(position)
+            return self._saturated(key, self._role(key))
+
+    def reset_saturation(self, position=None):
+        """Let the position's role (or every role) call the LLM again until it saturates anew"""
+        with self._lock:
+            keys = [normalize_position(position)] if position is not None else list(self._roles)
+            for key in keys:
+                bank = self._role(key)
+                bank.low_yield = 0
+                bank.saturated_at = None
+            if self._db is not None:
+                if position is None:
+                    self._db.execute("UPDATE bank_roles SET low_yield = 0, saturated_at = NULL")
+                else:
+                    self._db.execute("UPDATE bank_roles SET low_yield = 0, saturated_at = NULL WHERE key = ?", keys)
+                self._db.commit()
+
+    def draw(self, position, count):
+        """A randomized set of up to `count` distinct questions, copied; O(count) per draw"""
+        with self._lock:
+            key = normalize_position(position)
+            bank = self._role(key)
+            now = time.time()
+            # Recency for disk eviction; a minute's precision is plenty and spares a commit per draw
+            if self._db is not None and key and now - bank.accessed_at > 60:
+                bank.accessed_at = now
+                self._save_role(key, bank)
+                self._db.commit()
+            return copy_questions(bank.draw(count))
+
+    def export(self):
+        """Yield (role key, questions) for every banked role, e.g. to build a question pack"""
+        with self._lock:
+            if self._db is None:
+                keys = list(self._roles)
+            else:
+                keys = [row[0] for row in self._db.execute("SELECT DISTINCT key FROM bank_questions ORDER BY key")]
+        for key in keys:
+            with self._lock:
+                questions = copy_questions(self._role(key).questions)
+            if questions:
+                yield key, questions
+
+    def clear(self):
+        """Drop every banked question"""
+        with self._lock:
+            self._roles.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM bank_questions")
+                self._db.execute("DELETE FROM bank_roles")
+                self._db.commit()
+
+    def _saturated(self, key, bank):
+        if bank.low_yield < QUESTION_BANK_PATIENCE:
+            return False
+        if bank.saturated_at is not None and time.time() - bank.saturated_at < self.saturation_ttl:
+            return True
+        # Expired: give generation another QUESTION_BANK_PATIENCE chances
+        bank.low_yield = 0
+        bank.saturated_at = None
+        if self._db is not None:
+            self._save_role(key, bank)
+            self._db.commit()
+        return False
+
+    def _save_role(self, key, bank):
+        self._db.execute(
+            "INSERT OR REPLACE INTO bank_roles (key, low_yield, saturated_at, accessed_at) VALUES (?, ?, ?, ?)",
+            (key, bank.low_yield, bank.saturated_at, bank.accessed_at),
+        )
+
+    def _evict_disk(self, now):
+        """Delete expired questions and the least recently used roles beyond disk_roles"""
+        self._db.execute("DELETE FROM bank_questions WHERE added_at <= ?", (now - self.ttl,))
+        evicted = [row[0] for row in self._db.execute(
+            "SELECT key FROM bank_roles ORDER BY accessed_at DESC LIMIT -1 OFFSET ?", (self.disk_roles,)
+        )]
+        for key in evicted:
+            self._db.execute("DELETE FROM bank_questions WHERE key = ?", (key,))
+            self._db.execute("DELETE FROM bank_roles WHERE key = ?", (key,))
+            self._roles.pop(key, None)
+
+    def _role(self, key):
+        cutoff = time.time() - self.ttl
+        bank = self._roles.get(key)
+        if bank is not None and bank.expired(cutoff):
+            bank = self._roles[key] = bank.without_first(bank.expired(cutoff))
+            if self._db is not None:
+                self._db.execute("DELETE FROM bank_questions WHERE key = ? AND added_at <= ?", (key, cutoff))
+                self._db.commit()
+        if bank is None:
+            bank = RoleBank()
+            if self._db is not None and key:
+                rows = self._db.execute(
+                    "SELECT question, signature, added_at FROM bank_questions WHERE key = ? AND added_at > ? ORDER BY rowid",
+                    (key, cutoff),
+                ).fetchall()
+                for question, signature, added_at in rows:
+                    bank.add(json.loads(question), array("I", signature), added_at)
+                row = self._db.execute(
+                    "SELECT low_yield, saturated_at, accessed_at FROM bank_roles WHERE key = ?", (key,)
+                ).fetchone()
+                if row:
+                    bank.low_yield, bank.saturated_at, bank.accessed_at = row
+            self._roles[key] = bank
+            while len(self._roles) > self.memory_roles:
+                self._roles.popitem(last=False)
+        self._roles.move_to_end(key)
+        return bank
+
+_question_bank = None
+_question_bank_lock = threading.Lock()
+
+def get_question_bank():
+    """Return the process-wide question bank"""
+    global _question_bank
+    if _question_bank is None:
+        with _question_bank_lock:
+            if _question_bank is None:
+                _question_bank = QuestionBank()
+    return _question_bank
@@ -0,0 +1,97 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from metrics import increment
+
+GENERATION_WORKERS = int(os.getenv("QUESTION_GENERATION_WORKERS", "8"))
+# Longest a chat turn waits on generation: for the first question (the consent turn) and for each later one
+QUESTION_WAIT_BUDGET = float(os.getenv("QUESTION_WAIT_BUDGET", "8"))
+QUESTION_NEXT_BUDGET = float(os.getenv("QUESTION_NEXT_BUDGET", "2"))
+
+# Lives at import time of this module rather than in app.py, which Streamlit re-executes on every rerun
+_executor = ThreadPoolExecutor(max_workers=GENERATION_WORKERS, thread_name_prefix="question-gen")
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+class QuestionJob:
+    """Questions produced by a background worker, readable from the chat thread as they arrive"""
+
+    def __init__(self, key=None):
+        self.key = key
+        self.questions = []
+        self.done = False
+        self.error = None
+        self._condition = threading.Condition()
+
+    def run(self, source):
+        try:
+            for question in source:
+                with self._condition:
+                    self.questions.append(question)
+                    self._condition.notify_all()
+        except Exception as e:
+            self.error = e
+            record_job_failure(self.key, e)
+        finally:
+            with self._condition:
+                self.done = True
+                self._condition.notify_all()
+            with _inflight_lock:
+                if _inflight.get(self.key) is self:
+                    del _inflight[self.key]
+
+    def wait_for(self, index, timeout=QUESTION_WAIT_BUDGET):
+        """Return question `index` once available, or None if the job ended or the budget ran out"""
+        with self._condition:
+            self._condition.wait_for(lambda: self.done or len(self.questions) > index, timeout)
+            if index < len(self.questions):
+                return self.questions[index]
+            return None
+
+def start_question_job(source, key=None):
+    """Consume a question iterator on the shared worker pool and return its job handle
+
+    Jobs started with the same key while one is still in flight share that job instead
+    of running `source`, so concurrent candidates for one role cost a single generation.
+    Shared jobs hand out the same question dicts, so readers must copy before mutating.
+    """
+    with _inflight_lock:
+        if key is not None and key in _inflight:
+            increment("question_jobs_coalesced_total")
+            return _inflight[key]
+        job = QuestionJob(key)
+        if key is not None:
+            _inflight[key] = job
+    increment("question_jobs_started_total")
+    _executor.submit(job.run, source)
+    return job
+
+def finished_question_job(questions):
+    """A job handle for questions that are already available, e.g. drawn from a question bank"""
+    job = QuestionJob()
+    job.questions = list(questions)
+    job.done = True
+    return job
+
+def record_budget_miss(stage, waited):
+    """Count a turn that gave up waiting on generation at `stage` ('first' or 'next')"""
+    increment("question_budget_misses_total", stage=stage)
+    logger.warning("Question generation missed the %s-question budget after %.1fs", stage, waited)
+
+def record_job_failure(key, error):
+    """Count and log a job that ended in an error; its readers fall back to other questions
+
+    A failed or timed-out LLM call is expected now and then and was already logged where
+    it happened; anything else is a bug in the bank, parser or storage path and is
+    logged here with its traceback.
+    """
+    from prompts import QuestionGenerationError
+    expected = isinstance(error, (QuestionGenerationError, TimeoutError))
+    increment("question_job_failures_total", kind="generation" if expected else "unexpected")
+    if expected:
+        logger.info("Question generation for %r failed: %s", key, error)
+    else:
+        logger.error("Question job for %r failed", key, exc_info=error)
@@ -0,0 +1,217 @@
+"""Build and read question packs: every role's questions in one memory-mapped file.
+
+Usage:
+    python question_pack.py [--db question_bank.db] [--output question_pack.bin] [--fallback-role "Software Engineer"]
+
+Exports every role in the question bank into a versioned binary pack. The app maps
+the pack read-only, so all worker processes on a host share one page-cached copy,
+and roles found in it are served without an LLM call or database query.
+
+Layout (little-endian):
+    header     magic "TSQP", version, role count, question count, section offsets, pack id
+    roles      one 16-byte record per role, sorted by key: key offset and length,
+               first question id, question count
+    questions  one 16-byte record per question: text offset, text length, the four
+               option lengths, answer index (255 if none), difficulty (0 if unrated)
+    strings    UTF-8 role keys, and each question's text followed by its options
+"""
+import argparse
+import hashlib
+import logging
+import mmap
+import os
+import random
+import struct
+import sys
+import threading
+
+from question_bank import QUESTION_BANK_DB, QuestionBank, normalize_position
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+QUESTION_PACK = os.getenv("QUESTION_PACK", os.path.join(BASE_DIR, "question_pack.bin"))
+# Questions for positions the pack has no role for, in place of the built-in generic set
+FALLBACK_ROLE = "general"
+
+PACK_MAGIC = b"TSQP"
+PACK_VERSION = 1
+HEADER = struct.Struct("<4sHHIIQQQ8s")
+ROLE_RECORD = struct.Struct("<IHHII")
+QUESTION_RECORD = struct.Struct("<IH4HBB")
+NO_ANSWER = 255
+ANSWER_LETTERS = "ABCD"
+
+def packable(question):
+    """Whether a question fits a pack record: four options and no string over 64 KiB"""
+    strings = [question['question']] + list(question['options'])
+    return len(question['options']) == 4 and all(len(s.encode("utf-8")) <= 0xFFFF for s in strings)
+
+def write_pack(banks, path):
+    """Write {role: questions} to `path` atomically, skipping unpackable questions; returns the pack id (hex)"""
+    roles = sorted(
+        (normalize_position(role).encode("utf-8"), [q for q in questions if packable(q)])
+        for role, questions in banks.items()
+    )
+    strings = bytearray()
+    role_records = bytearray()
+    question_records = bytearray()
+    question_count = 0
+    for key, questions in roles:
+        role_records += ROLE_RECORD.pack(len(strings), len(key), 0, question_count, len(questions))
+        strings += key
+        for question in questions:
+            text = question['question'].encode("utf-8")
+            options = [option.encode("utf-8") for option in question['options']]
+            answer = question.get('correct_answer')
+            question_records += QUESTION_RECORD.pack(
+                len(strings), len(text), *(len(option) for option in options),
+                ANSWER_LETTERS.index(answer) if answer else NO_ANSWER, question.get('difficulty') or 0,
+            )
+            strings += text + b"".join(options)
+        question_count += len(questions)
+
+    body = bytes(role_records + question_records + strings)
+    roles_offset = HEADER.size
+    questions_offset = roles_offset + len(role_records)
+    strings_offset = questions_offset + len(question_records)
+    pack_id = hashlib.sha256(body).digest()[:8]
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(HEADER.pack(PACK_MAGIC, PACK_VERSION, 0, len(roles), question_count,
+                            roles_offset, questions_offset, strings_offset, pack_id))
+        f.write(body)
+    os.replace(temp_path, path)
+    return pack_id.hex()
+
+class QuestionPack:
+    """Read-only, memory-mapped view of a question pack
+
+    Nothing is decoded up front: roles are found by binary search over the sorted
+    role records, and a question is decoded from the mapped bytes when it is read.
+    Questions are referred to by their integer id, stable for a given pack.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            (magic, version, _, self.role_count, self.question_count,
+             self._roles_offset, self._questions_offset, self._strings_offset, pack_id) = HEADER.unpack_from(self._map)
+        except struct.error:
+            raise ValueError(f"{path} is too short to be a question pack")
+        if magic != PACK_MAGIC:
+            raise ValueError(f"{path} is not a question pack")
+        if version != PACK_VERSION:
+            raise ValueError(f"{path} is question pack version {version}, expected {PACK_VERSION}")
+        if self._strings_offset > len(self._map):
+            raise ValueError(f"{path} is truncated")
+        self.pack_id = pack_id.hex()
+
+    def role_key(self, index):
+        offset, length, _, _, _ = ROLE_RECORD.unpack_from(self._map, self._roles_offset + index * ROLE_RECORD.size)
+        start = self._strings_offset + offset
+        return self._map[start:start + length]
+
+    def find_role(self, position):
+        """(first question id, question count) for a position's role, or None"""
+        key = normalize_position(position).encode("utf-8")
+        low, high = 0, self.role_count
+        while low < high:
+            middle = (low + high) // 2
+            if self.role_key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low == self.role_count or self.role_key(low) != key:
+            return None
+        _, _, _, first, count = ROLE_RECORD.unpack_from(self._map, self._roles_offset + low * ROLE_RECORD.size)
+        return first, count
+
+    def roles(self):
+        for index in range(self.role_count):
+            yield self.role_key(index).decode("utf-8")
+
+    def question(self, question_id):
+        """Decode one question into the dict shape the rest of the app uses"""
+        if not 0 <= question_id < self.question_count:
+            raise IndexError(f"question {question_id} is not in pack {self.pack_id}")
+        offset, text_length, *option_lengths, answer, difficulty = QUESTION_RECORD.unpack_from(
+            self._map, self._questions_offset + question_id * QUESTION_RECORD.size)
+        position = self._strings_offset + offset
+        text = self._map[position:position + text_length].decode("utf-8")
+        position += text_length
+        options = []
+        for length in option_lengths:
+            options.append(self._map[position:position + length].decode("utf-8"))
+            position += length
+        question = {
+            'question': text,
+            'options': options,
+            'correct_answer': ANSWER_LETTERS[answer] if answer != NO_ANSWER else None,
+        }
+        if difficulty:
+            question['difficulty'] = difficulty
+        return question
+
+    def draw(self, position, count):
+        """Ids of up to `count` distinct random questions for a position's role; O(count)"""
+        role = self.find_role(position)
+        if role is None:
+            return []
+        first, total = role
+        return random.sample(range(first, first + total), min(count, total))
+
+    def close(self):
+        self._map.close()
+
+_question_pack = None
+_question_pack_loaded = False
+_question_pack_lock = threading.Lock()
+
+def get_question_pack(path=QUESTION_PACK):
+    """Return the process-wide question pack, or None if there is no usable pack at `path`"""
+    global _question_pack, _question_pack_loaded
+    if not _question_pack_loaded:
+        with _question_pack_lock:
+            if not _question_pack_loaded:
+                if path and os.path.exists(path):
+                    try:
+                        _question_pack = QuestionPack(path)
+                    except (OSError, ValueError) as e:
+                        logger.warning("Ignoring question pack %s: %s", path, e)
+                _question_pack_loaded = True
+    return _question_pack
+
+def resolve_question(question):
+    """A question as a dict, whether it is one already or the id of a question in the pack"""
+    if isinstance(question, int):
+        pack = get_question_pack()
+        if pack is None:
+            raise LookupError(f"question {question} refers to a question pack this process has not loaded")
+        return pack.question(question)
+    return question
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the question bank into a memory-mapped question pack.")
+    parser.add_argument("--db", default=QUESTION_BANK_DB, help="question bank database to export")
+    parser.add_argument("--output", default=QUESTION_PACK, help="pack file to write")
+    parser.add_argument("--fallback-role", help=f"role whose questions are also packed as '{FALLBACK_ROLE}', "
+                                                "for positions the pack does not cover")
+    args = parser.parse_args(argv)
+
+    banks = dict(QuestionBank(args.db).export())
+    if args.fallback_role:
+        fallback = banks.get(normalize_position(args.fallback_role))
+        if not fallback:
+            parser.error(f"no questions banked for {args.fallback_role!r}")
+        banks[FALLBACK_ROLE] = fallback
+    if not banks:
+        parser.error(f"no questions banked in {args.db}")
+    pack_id = write_pack(banks, args.output)
+    print(f"{args.output}: {len(banks)} roles, {sum(len(q) for q in banks.values())} questions, "
+          f"{os.path.getsize(args.output)} bytes, id {pack_id}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,229 @@
+import logging
+import os
+import re
+import threading
+from prompts import generate_tech_questions, generate_structured_questions, get_llm_client, stream_structured_questions
+from question_bank import get_question_bank, normalize_position
+from question_jobs import finished_question_job, start_question_job
+from question_pack import FALLBACK_ROLE, get_question_pack
+from metrics import increment, timed
+
+logger = logging.getLogger(__name__)
+
+# Hand out each generated question as soon as it has streamed in, for JSON and text output alike
+STREAM_QUESTIONS = os.getenv("STREAM_QUESTIONS", "1") != "0"
+STRUCTURED_QUESTIONS = os.getenv("STRUCTURED_QUESTIONS", "1") != "0"
+# Load the LLM SDK and the role index on a background thread at startup rather than on first use
+QUESTION_WARMUP = os.getenv("QUESTION_WARMUP", "1") != "0"
+
+QUESTION_LINE_PATTERN = re.compile(r'^\d+\.|\bQ(uestion)?\s*\d+[\.\:]|^\[\d+\]')
+OPTION_LINE_PATTERN = re.compile(r'^[A-D][\)\.]|^- [A-D][\)\.]')
+OPTION_PREFIX_PATTERN = re.compile(r'^[A-D][\)\.]\s*|- [A-D][\)\.]\s*')
+OPTIONS_PER_QUESTION = 4
+MAX_QUESTIONS = 15
+
+def iter_lines(chunks):
+    buffer = ""
+    for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split('\n')
+        yield from lines
+    if buffer:
+        yield buffer
+
+def iter_mcqs(chunks):
+    """Incrementally parse MCQs from text chunks, yielding each question once its last option arrives"""
+    current_question = None
+    options = []
+    seen = 0
+    parsed = 0
+    
+    try:
+        for line in iter_lines(chunks):
+            line = line.strip()
+            if not line:
+                continue
+                
+            if QUESTION_LINE_PATTERN.match(line):
+                if current_question and 0 < len(options) < OPTIONS_PER_QUESTION:
+                    parsed += 1
+                    yield {
+                        'question': current_question,
+                        'options': options.copy(),
+                        'correct_answer': None
+                    }
+                    
+                current_question = QUESTION_LINE_PATTERN.sub('', line).strip()
+                options = []
+                seen += 1
+            
+            elif OPTION_LINE_PATTERN.match(line) and len(options) < OPTIONS_PER_QUESTION:
+                options.append(OPTION_PREFIX_PATTERN.sub('', line).strip())
+                if current_question and len(options) == OPTIONS_PER_QUESTION:
+                    parsed += 1
+                    yield {
+                        'question': current_question,
+                        'options': options.copy(),
+                        'correct_answer': None
+                    }
+        
+        if current_question and 0 < len(options) < OPTIONS_PER_QUESTION:
+            parsed += 1
+            yield {
+                'question': current_question,
+                'options': options.copy(),
+                'correct_answer': None
+            }
+    finally:
+        # Also counted when the consumer stops early, as stream_position_questions does at MAX_QUESTIONS
+        increment("questions_parsed_total", parsed, format="text")
+        increment("questions_dropped_total", max(0, seen - parsed), format="text")
+
+@timed("parse_seconds", format="text")
+def parse_mcqs(questions_text):
+    return list(iter_mcqs([questions_text]))
+
+def load_position_questions(position):
+    """Deal questions from the position's bank once it is full, otherwise generate and bank new ones"""
+    bank = get_question_bank()
+    if bank.can_draw(position, MAX_QUESTIONS):
+        return bank.draw(position, MAX_QUESTIONS)
+    if STRUCTURED_QUESTIONS:
+        questions = generate_structured_questions(position)
+    else:
+        questions = parse_mcqs(generate_tech_questions(position))
+    if questions:
+        bank.add(position, questions)
+    return questions
+
+def stream_position_questions(position):
+    """Yield parsed questions for a position as soon as each one is available"""
+    bank = get_question_bank()
+    if bank.can_draw(position, MAX_QUESTIONS):
+        yield from bank.draw(position, MAX_QUESTIONS)
+        return
+    
+    if STRUCTURED_QUESTIONS:
+        generated = stream_structured_questions(position)
+    else:
+        generated = iter_mcqs(generate_tech_questions(position, stream=True))
+    questions = []
+    for question in generated:
+        questions.append(question)
+        yield dict(question, options=list(question['options']))
+        if len(questions) >= MAX_QUESTIONS:
+            break
+    if questions:
+        bank.add(position, questions)
+
+def blocking_position_questions(position):
+    yield from load_position_questions(position)[:MAX_QUESTIONS]
+
+def start_position_questions(position):
+    """Start generating questions for a position on the background worker pool
+
+    Free-text positions are mapped to a canonical role first, so near-duplicate
+    titles share one question bank and one in-flight generation. Roles in the
+    question pack, or whose bank is full, get each candidate their own draw and no
+    job is started; pack draws are question ids rather than dicts.
+    """
+    from positions import canonical_position
+    position = canonical_position(position)
+    pack = get_question_pack()
+    drawn = pack.draw(position, MAX_QUESTIONS) if pack is not None else []
+    if drawn:
+        return finished_question_job(drawn)
+    bank = get_question_bank()
+    if bank.can_draw(position, MAX_QUESTIONS):
+        return finished_question_job(bank.draw(position, MAX_QUESTIONS))
+    key = normalize_position(position)
+    if STREAM_QUESTIONS:
+        return start_question_job(stream_position_questions(position), key)
+    return start_question_job(blocking_position_questions(position), key)
+
+_warm_up_started = False
+_warm_up_lock = threading.Lock()
+
+def start_warm_up(enabled=QUESTION_WARMUP):
+    """Build the LLM client and role index in the background, once per process
+
+    Neither is loaded at import time so the first page paints quickly; warming them
+    here keeps that cost off the first intake and question generation too.
+    """
+    global _warm_up_started
+    if not enabled:
+        return
+    with _warm_up_lock:
+        if _warm_up_started:
+            return
+        _warm_up_started = True
+    threading.Thread(target=_warm_up, name="question-warmup", daemon=True).start()
+
+def _warm_up():
+    try:
+        from positions import get_role_index
+        get_llm_client()
+        get_role_index()
+    except Exception as e:
+        # The first real call retries the same setup and reports the error to the user
+        logger.warning("Warm-up failed: %s", e)
+
+def fallback_questions(position):
+    """Questions for when generation produced none: the pack's general role if it has one, else a built-in set"""
+    pack = get_question_pack()
+    drawn = pack.draw(FALLBACK_ROLE, MAX_QUESTIONS) if pack is not None else []
+    return drawn or build_fallback_questions(position)
+
+def build_fallback_questions(position):
+    return [
+        {
+            'question': f"Which of the following is most important for a {position} role?",
+            'options': [
+                f"Technical expertise in {position}",
+                "Communication skills",
+                "Time management",
+                "Problem-solving ability"
+            ],
+            'correct_answer': None
+        },
+        {
+            'question': f"What methodology is commonly used in {position} projects?",
+            'options': [
+                "Agile",
+                "Waterfall",
+                "Scrum",
+                "Kanban"
+            ],
+            'correct_answer': None
+        },
+        {
+            'question': f"Which skill is most valuable for a {position}?",
+            'options': [
+                "Team collaboration",
+                "Attention to detail",
+                "Fast learning",
+                "Independent work"
+            ],
+            'correct_answer': None
+        },
+        {
+            'question': f"Which tool is most relevant for a {position}?",
+            'options': [
+                "Microsoft Office",
+                "Adobe Creative Suite",
+                "Programming IDEs",
+                "Project management software"
+            ],
+            'correct_answer': None
+        },
+        {
+            'question': f"What's the best approach to problem-solving as a {position}?",
+            'options': [
+                "Ask colleagues",
+                "Research solutions",
+                "Trial and error",
+                "Follow established procedures"
+            ],
+            'correct_answer': None
+        }
+    ]
@@ -0,0 +1,443 @@
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+from engine import ConversationEngine, STATE_LISTS
+
+logger = logging.getLogger(__name__)
+
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")
+SESSION_DB_PATH = os.getenv("SESSION_DB", "sessions.db")
+SESSION_REDIS_URL = os.getenv("SESSION_REDIS_URL", "redis://localhost:6379/0")
+# Idle time after which a session is reaped; a candidate returning later starts over
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL", str(2 * 3600)))
+# Sessions whose last-saved snapshot this process remembers for dirty tracking
+TRACKED_SESSIONS = int(os.getenv("SESSION_TRACKED", "10000"))
+# Caps for the memory backend; the least recently saved sessions are evicted first
+MEMORY_MAX_SESSIONS = int(os.getenv("SESSION_MEMORY_MAX_SESSIONS", "20000"))
+MEMORY_MAX_BYTES = int(os.getenv("SESSION_MEMORY_MAX_BYTES", str(256 * 1024 * 1024)))
+REAP_INTERVAL_SECONDS = float(os.getenv("SESSION_REAP_INTERVAL", "60"))
+
+def encode(value):
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+def decode(text):
+    return json.loads(text)
+
+class SessionBackend:
+    """Stores a session as named fields plus lists, all holding encoded strings
+
+    save() takes `fields` {name: value} to overwrite and `lists` {name: (start, items)},
+    meaning: truncate the list to `start` items, then append `items`.
+    """
+
+    def load(self, session_id):
+        """Return (fields, lists) for a session, or None if it is unknown or expired"""
+        raise NotImplementedError
+
+    def save(self, session_id, fields, lists):
+        raise NotImplementedError
+
+    def delete(self, session_id):
+        raise NotImplementedError
+
+    def reap(self):
+        """Drop sessions idle for longer than the TTL; returns how many were dropped"""
+        return 0
+
+class MemorySessionBackend(SessionBackend):
+    """Process-local backend; sessions do not survive a restart or move between replicas
+
+    Sessions are kept in save order, so reaping idle ones and evicting the least
+    recently active to stay under `max_sessions` and `max_bytes` only touch the front.
+    """
+
+    def __init__(self, ttl=SESSION_TTL_SECONDS, max_sessions=MEMORY_MAX_SESSIONS, max_bytes=MEMORY_MAX_BYTES):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.evicted = 0
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self, session_id):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            if time.time() - session["updated_at"] >= self.ttl:
+                self._drop(session_id)
+                return None
+            return dict(session["fields"]), {name: list(items) for name, items in session["lists"].items()}
+
+    def save(self, session_id, fields, lists):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = {"fields": {}, "lists": {}, "updated_at": 0, "bytes": 0}
+            self._sessions.move_to_end(session_id)
+            size = session["bytes"]
+            for name, value in fields.items():
+                size += len(value) - len(session["fields"].get(name, ""))
+                session["fields"][name] = value
+            for name, (start, items) in lists.items():
+                stored = session["lists"].setdefault(name, [])
+                size -= sum(len(item) for item in stored[start:])
+                del stored[start:]
+                stored.extend(items)
+                size += sum(len(item) for item in items)
+            self.total_bytes += size - session["bytes"]
+            session["bytes"] = size
+            session["updated_at"] = time.time()
+            while len(self._sessions) > 1 and (
+                    len(self._sessions) > self.max_sessions or self.total_bytes > self.max_bytes):
+                self._drop(next(iter(self._sessions)))
+                self.evicted += 1
+
+    def delete(self, session_id):
+        with self._lock:
+            self._drop(session_id)
+
+    def reap(self):
+        cutoff = time.time() - self.ttl
+        reaped = 0
+        with self._lock:
+            while self._sessions:
+                session_id, session = next(iter(self._sessions.items()))
+                if session["updated_at"] > cutoff:
+                    break
+                self._drop(session_id)
+                reaped += 1
+        return reaped
+
+    def stats(self):
+        with self._lock:
+            return {"sessions": len(self._sessions), "bytes": self.total_bytes, "evicted": self.evicted}
+
+    def _drop(self, session_id):
+        session = self._sessions.pop(session_id, None)
+        if session is not None:
+            self.total_bytes -= session["bytes"]
+
+class SQLiteSessionBackend(SessionBackend):
+    """Sessions in a WAL-mode SQLite file, shareable by replicas on one host or volume"""
+
+    def __init__(self, db_path=SESSION_DB_PATH, ttl=SESSION_TTL_SECONDS):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS sessions (session_id TEXT PRIMARY KEY, updated_at REAL NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at);"
+            "CREATE TABLE IF NOT EXISTS session_fields (session_id TEXT NOT NULL, name TEXT NOT NULL, "
+            "value TEXT NOT NULL, PRIMARY KEY (session_id, name)) WITHOUT ROWID;"
+            "CREATE TABLE IF NOT EXISTS session_items (session_id TEXT NOT NULL, list TEXT NOT NULL, "
+            "position INTEGER NOT NULL, value TEXT NOT NULL, PRIMARY KEY (session_id, list, position)) WITHOUT ROWID;"
+        )
+        self._db.commit()
+
+    def load(self, session_id):
+        with self._lock:
+            row = self._db.execute("SELECT updated_at FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+            if row is None:
+                return None
+            if time.time() - row[0] >= self.ttl:
+                self._delete(session_id)
+                self._db.commit()
+                return None
+            fields = dict(self._db.execute(
+                "SELECT name, value FROM session_fields WHERE session_id = ?", (session_id,)
+            ))
+            lists = {}
+            for name, value in self._db.execute(
+                "SELECT list, value FROM session_items WHERE session_id = ? ORDER BY list, position", (session_id,)
+            ):
+                lists.setdefault(name, []).append(value)
+            return fields, lists
+
+    def save(self, session_id, fields, lists):
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, updated_at) VALUES (?, ?)", (session_id, time.time())
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO session_fields (session_id, name, value) VALUES (?, ?, ?)",
+                [(session_id, name, value) for name, value in fields.items()]
+            )
+            for name, (start, items) in lists.items():
+                self._db.execute(
+                    "DELETE FROM session_items WHERE session_id = ? AND list = ? AND position >= ?",
+                    (session_id, name, start)
+                )
+                self._db.executemany(
+                    "INSERT INTO session_items (session_id, list, position, value) VALUES (?, ?, ?, ?)",
+                    [(session_id, name, start + i, value) for i, value in enumerate(items)]
+                )
+
+    def delete(self, session_id):
+        with self._lock, self._db:
+            self._delete(session_id)
+
+    def reap(self):
+        with self._lock, self._db:
+            expired = self._db.execute(
+                "SELECT session_id FROM sessions WHERE updated_at <= ?", (time.time() - self.ttl,)
+            ).fetchall()
+            for (session_id,) in expired:
+                self._delete(session_id)
+        return len(expired)
+
+    def _delete(self, session_id):
+        for table in ("sessions", "session_fields", "session_items"):
+            self._db.execute(f"DELETE FROM {table} WHERE session_id = ?", (session_id,))
+
+class RedisError(Exception):
+    """Error reply from a Redis-protocol server"""
+
+class RespConnection:
+    """Minimal pipelining client for the Redis serialization protocol (RESP2)
+
+    Enough for the hash and list commands the session backend uses, without a client
+    library dependency; works against Redis, Valkey, KeyDB or a local stand-in server.
+    """
+
+    def __init__(self, url=SESSION_REDIS_URL, timeout=5):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self._sock = None
+        self._reader = None
+        self._lock = threading.Lock()
+
+    def execute(self, *commands):
+        """Send commands in one round trip and return their replies in order"""
+        with self._lock:
+            try:
+                return self._execute(commands)
+            except ConnectionError:
+                # One retry on a fresh connection covers servers that dropped an idle socket
+                self._close()
+                return self._execute(commands)
+
+    def _execute(self, commands):
+        if self._sock is None:
+            self._connect()
+        self._sock.sendall(b"".join(self._pack(command) for command in commands))
+        replies = [self._read() for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+        return replies
+
+    def _connect(self):
+        self._sock = socket.create_connection((self.host, self.port), self.timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = self._sock.makefile("rb")
+        setup = []
+        if self.password:
+            setup.append(("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", self.db))
+        if setup:
+            self._execute(setup)
+
+    def _close(self):
+        if self._sock is not None:
+            self._sock.close()
+        self._sock = None
+        self._reader = None
+
+    @staticmethod
+    def _pack(command):
+        parts = [b"*%d\r\n" % len(command)]
+        for arg in command:
+            data = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(parts)
+
+    def _read(self):
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("Redis connection closed")
+        prefix, body = line[:1], line[1:-2]
+        if prefix == b"+":
+            return body.decode("utf-8")
+        if prefix == b"-":
+            return RedisError(body.decode("utf-8"))
+        if prefix == b":":
+            return int(body)
+        if prefix == b"$":
+            length = int(body)
+            if length < 0:
+                return None
+            data = self._reader.read(length + 2)
+            return data[:-2].decode("utf-8")
+        if prefix == b"*":
+            length = int(body)
+            return None if length < 0 else [self._read() for _ in range(length)]
+        raise RedisError(f"Unexpected reply: {line!r}")
+
+class RedisSessionBackend(SessionBackend):
+    """Sessions in a Redis-protocol server: a hash of fields plus one list per list field"""
+
+    def __init__(self, url=SESSION_REDIS_URL, ttl=SESSION_TTL_SECONDS, prefix="talentscout:session:"):
+        self.ttl = ttl
+        self.prefix = prefix
+        self._connection = RespConnection(url)
+
+    def _keys(self, session_id):
+        key = self.prefix + session_id
+        return key, {name: f"{key}:{name}" for name in STATE_LISTS}
+
+    def load(self, session_id):
+        key, list_keys = self._keys(session_id)
+        replies = self._connection.execute(("HGETALL", key), *[("LRANGE", k, 0, -1) for k in list_keys.values()])
+        flat = replies[0]
+        if not flat:
+            return None
+        fields = dict(zip(flat[::2], flat[1::2]))
+        return fields, {name: items for name, items in zip(list_keys, replies[1:]) if items}
+
+    def save(self, session_id, fields, lists):
+        key, list_keys = self._keys(session_id)
+        commands = [("MULTI",)]
+        if fields:
+            commands.append(("HSET", key, *[part for item in fields.items() for part in item]))
+        for name, (start, items) in lists.items():
+            list_key = list_keys[name]
+            commands.append(("LTRIM", list_key, 0, start - 1) if start else ("DEL", list_key))
+            if items:
+                commands.append(("RPUSH", list_key, *items))
+        # Lists this save left alone must not expire before the hash that refers to them
+        commands.extend(("EXPIRE", k, self.ttl) for k in (key, *list_keys.values()))
+        commands.append(("EXEC",))
+        self._connection.execute(*commands)
+
+    def delete(self, session_id):
+        key, list_keys = self._keys(session_id)
+        self._connection.execute(("DEL", key, *list_keys.values()))
+
+def create_session_backend(name=SESSION_BACKEND):
+    """Build the backend named by SESSION_BACKEND ('memory', 'sqlite' or 'redis')"""
+    if name == "memory":
+        return MemorySessionBackend()
+    if name == "sqlite":
+        return SQLiteSessionBackend()
+    if name == "redis":
+        return RedisSessionBackend()
+    raise ValueError(f"Unknown session backend: {name}")
+
+class SessionStore:
+    """Saves and restores ConversationEngine state through a SessionBackend with dirty tracking
+
+    For every session it saved or loaded, the store remembers each field's encoding and
+    how much of each list was written, so a turn writes only the fields that changed and
+    the list items appended since the last save.
+    """
+
+    def __init__(self, backend, tracked_sessions=TRACKED_SESSIONS):
+        self.backend = backend
+        self.tracked_sessions = tracked_sessions
+        self._saved = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self, session_id):
+        """Return the engine for a session, or None if the backend does not have it"""
+        stored = self.backend.load(session_id)
+        if stored is None:
+            return None
+        fields, lists = stored
+        state = {name: decode(value) for name, value in fields.items()}
+        for name in STATE_LISTS:
+            state[name] = [decode(item) for item in lists.get(name, [])]
+        last_items = {name: items[-1] for name, items in lists.items() if items}
+        self._remember(session_id, dict(fields), {name: len(items) for name, items in lists.items()}, last_items)
+        return ConversationEngine.from_state(state)
+
+    def save(self, engine):
+        """Write what changed since this session was last saved or loaded; returns the values written"""
+        state = engine.to_state()
+        with self._lock:
+            saved = self._saved.get(engine.session_id)
+        saved_fields, saved_lengths, saved_last = saved or ({}, {}, {})
+
+        fields = {}
+        for name, value in state.items():
+            if name in STATE_LISTS:
+                continue
+            encoded = encode(value)
+            if saved_fields.get(name) != encoded:
+                fields[name] = encoded
+
+        lists = {}
+        lengths = dict(saved_lengths)
+        last_items = dict(saved_last)
+        for name in STATE_LISTS:
+            items = state[name]
+            start = saved_lengths.get(name)
+            # A list that shrank or was replaced since the last save is rewritten from the start
+            unchanged_prefix = start is not None and start <= len(items) and (
+                not start or encode(items[start - 1]) == saved_last.get(name))
+            if not unchanged_prefix:
+                start = 0
+            elif start == len(items):
+                continue
+            encoded = [encode(item) for item in items[start:]]
+            lists[name] = (start, encoded)
+            lengths[name] = len(items)
+            last_items[name] = encoded[-1] if encoded else None
+
+        if fields or lists:
+            self.backend.save(engine.session_id, fields, lists)
+        self._remember(engine.session_id, dict(saved_fields, **fields), lengths, last_items)
+        return len(fields) + sum(len(items) for _, items in lists.values())
+
+    def delete(self, session_id):
+        self.backend.delete(session_id)
+        with self._lock:
+            self._saved.pop(session_id, None)
+
+    def start_reaper(self, interval=REAP_INTERVAL_SECONDS):
+        """Reap idle sessions from the backend every `interval` seconds on a daemon thread"""
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.backend.reap()
+                except Exception as e:
+                    logger.warning("Session reaping failed: %s", e)
+        thread = threading.Thread(target=run, name="session-reaper", daemon=True)
+        thread.start()
+        return thread
+
+    def _remember(self, session_id, fields, lengths, last_items):
+        with self._lock:
+            self._saved[session_id] = (fields, lengths, last_items)
+            self._saved.move_to_end(session_id)
+            while len(self._saved) > self.tracked_sessions:
+                self._saved.popitem(last=False)
+
+_session_store = None
+_session_store_lock = threading.Lock()
+
+def get_session_store():
+    """Return the process-wide session store"""
+    global _session_store
+    if _session_store is None:
+        with _session_store_lock:
+            if _session_store is None:
+                _session_store = SessionStore(create_session_backend())
+                _session_store.start_reaper()
+    return _session_store
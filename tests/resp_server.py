@@ -0,0 +1,185 @@
+"""In-process stand-in for a Redis server, speaking RESP2 over a local socket
+
+Implements the commands RespConnection and RedisSessionBackend send, with Redis's
+semantics for them, so the session backend can be tested without a Redis install.
+Keys expire against `clock`, which tests can replace to move time forward.
+
+Usage:
+    server = RespServer()
+    server.start()
+    backend = RedisSessionBackend(server.url)
+    ...
+    server.stop()
+"""
+import socketserver
+import threading
+import time
+
+class RespServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, clock=time.monotonic, password=None):
+        super().__init__(("127.0.0.1", 0), RespHandler)
+        self.clock = clock
+        self.password = password
+        self.data = {}
+        self.expires = {}
+        self.commands = []
+        self.lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address
+        return f"redis://:{self.password}@{host}:{port}/1" if self.password else f"redis://{host}:{port}/0"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="resp-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def ttl(self, key):
+        """Seconds left on a key as Redis's TTL reports them: -2 if missing, -1 if persistent"""
+        with self.lock:
+            if self._get(key) is None:
+                return -2
+            if key not in self.expires:
+                return -1
+            return int(self.expires[key] - self.clock())
+
+    def run(self, *commands):
+        """Apply commands atomically and return their replies; an Exception is sent as an error reply"""
+        with self.lock:
+            return [self._apply(command) for command in commands]
+
+    def _apply(self, command):
+        name = command[0].upper()
+        handler = getattr(self, f"_cmd_{name.lower()}", None)
+        if handler is None:
+            return Exception(f"ERR unknown command '{name}'")
+        self.commands.append(name)
+        return handler(*command[1:])
+
+    def _get(self, key):
+        if key in self.expires and self.expires[key] <= self.clock():
+            self._delete(key)
+        return self.data.get(key)
+
+    def _delete(self, key):
+        self.expires.pop(key, None)
+        return self.data.pop(key, None) is not None
+
+    def _cmd_ping(self):
+        return Status("PONG")
+
+    def _cmd_auth(self, password):
+        return Status("OK") if password == self.password else Exception("WRONGPASS invalid password")
+
+    def _cmd_select(self, db):
+        return Status("OK")
+
+    def _cmd_hset(self, key, *pairs):
+        values = self._get(key)
+        if values is None:
+            values = self.data[key] = {}
+        added = 0
+        for field, value in zip(pairs[::2], pairs[1::2]):
+            added += field not in values
+            values[field] = value
+        return added
+
+    def _cmd_hgetall(self, key):
+        return [part for item in (self._get(key) or {}).items() for part in item]
+
+    def _cmd_rpush(self, key, *items):
+        values = self._get(key)
+        if values is None:
+            values = self.data[key] = []
+        values.extend(items)
+        return len(values)
+
+    def _cmd_lrange(self, key, start, stop):
+        return _list_range(self._get(key) or [], int(start), int(stop))
+
+    def _cmd_ltrim(self, key, start, stop):
+        values = self._get(key)
+        if values is not None:
+            values[:] = _list_range(values, int(start), int(stop))
+            if not values:
+                self._delete(key)
+        return Status("OK")
+
+    def _cmd_del(self, *keys):
+        return sum(self._get(key) is not None and self._delete(key) for key in keys)
+
+    def _cmd_expire(self, key, seconds):
+        if self._get(key) is None:
+            return 0
+        self.expires[key] = self.clock() + int(seconds)
+        return 1
+
+class Status(str):
+    """A simple-string reply such as +OK, as opposed to bulk string data"""
+
+def _list_range(values, start, stop):
+    """values[start..stop] with both ends inclusive and negative indexes from the end, as in LRANGE"""
+    if start < 0:
+        start = max(len(values) + start, 0)
+    if stop < 0:
+        stop += len(values)
+    return values[start:stop + 1] if start <= stop else []
+
+class RespHandler(socketserver.StreamRequestHandler):
+    """One client connection; MULTI queues commands until EXEC applies them under one lock"""
+
+    def handle(self):
+        queued = None
+        while True:
+            command = self._read_command()
+            if command is None:
+                return
+            name = command[0].upper()
+            if name == "MULTI":
+                queued = []
+                reply = Status("OK")
+            elif name == "EXEC":
+                reply = Exception("ERR EXEC without MULTI") if queued is None else self.server.run(*queued)
+                queued = None
+            elif queued is not None:
+                queued.append(command)
+                reply = Status("QUEUED")
+            else:
+                reply = self.server.run(command)[0]
+            self.wfile.write(_encode(reply))
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            raise ValueError(f"expected a RESP array, got {line!r}")
+        command = []
+        for _ in range(int(line[1:-2])):
+            header = self.rfile.readline()
+            data = self.rfile.read(int(header[1:-2]) + 2)
+            command.append(data[:-2].decode("utf-8"))
+        return command
+
+def _encode(reply):
+    if isinstance(reply, Exception):
+        return b"-%s\r\n" % str(reply).encode("utf-8")
+    if reply is None:
+        return b"$-1\r\n"
+    if isinstance(reply, int):
+        return b":%d\r\n" % reply
+    if isinstance(reply, list):
+        return b"*%d\r\n" % len(reply) + b"".join(_encode(item) for item in reply)
+    if isinstance(reply, Status):
+        return b"+%s\r\n" % reply.encode("utf-8")
+    data = reply.encode("utf-8")
+    return b"$%d\r\n%s\r\n" % (len(data), data)
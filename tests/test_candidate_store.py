@@ -0,0 +1,64 @@
+"""CandidateStore writes records behind the chat, and reports records it cannot write
+
+Run with:
+    python -m pytest tests
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from candidate_store import CandidateStore
+
+def record(session_id, **fields):
+    return dict({"session_id": session_id, "status": "completed", "name": "Alex Morgan", "score": 80.0,
+                 "answers": [{"question": "q", "answer": "A"}], "completed_at": 1.0}, **fields)
+
+class CandidateStoreTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def open_store(self, path):
+        store = CandidateStore(path, interval=0.01)
+        self.addCleanup(store.close)
+        return store
+
+    def test_write_and_fetch(self):
+        store = self.open_store(os.path.join(self.directory, "candidates.db"))
+        self.assertTrue(store.submit(record("s1")))
+        self.assertTrue(store.submit(record("s1", score=90.0)))
+        self.assertTrue(store.flush(5))
+        self.assertEqual(store.fetch("s1")["score"], 90.0)
+        self.assertEqual(store.fetch("s1")["answers"], [{"question": "q", "answer": "A"}])
+        self.assertIsNone(store.fetch("missing"))
+        self.assertEqual(store.stats()["written"], 2)
+
+    def test_unopenable_database_drops_with_an_error_and_recovers(self):
+        path = os.path.join(self.directory, "not-yet", "candidates.db")
+        with self.assertLogs("candidate_store", "ERROR") as logs:
+            store = self.open_store(path)
+            store.submit(record("s1"))
+            self.assertTrue(store.flush(5))
+        self.assertIn("Dropped 1 candidate records", "\n".join(logs.output))
+        self.assertEqual(store.stats()["dropped"], 1)
+        self.assertTrue(store._writer.is_alive())
+
+        os.mkdir(os.path.dirname(path))
+        store.submit(record("s2"))
+        self.assertTrue(store.flush(5))
+        self.assertEqual(store.fetch("s2")["name"], "Alex Morgan")
+        self.assertIsNone(store.fetch("s1"))
+
+    def test_disabled_store(self):
+        store = self.open_store("")
+        self.assertFalse(store.submit(record("s1")))
+        self.assertTrue(store.flush(1))
+        self.assertIsNone(store.fetch("s1"))
+
+if __name__ == "__main__":
+    unittest.main()
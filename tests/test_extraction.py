@@ -0,0 +1,80 @@
+"""scan_message and scan_intake on single- and multi-field candidate messages
+
+Run with:
+    python -m pytest tests
+"""
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from extraction import INTAKE_FIELDS, scan_intake, scan_message
+
+class ScanMessageTest(unittest.TestCase):
+    def test_multi_field_message(self):
+        entities = scan_message("My name is Alex Morgan, alex.morgan@example.com, +1 (555) 010-2233, 6 years")
+        self.assertEqual(entities.name, "Alex Morgan")
+        self.assertEqual(entities.email, "alex.morgan@example.com")
+        self.assertEqual(entities.phone, "+1 (555) 010-2233")
+        self.assertEqual(entities.experience, "6")
+
+    def test_experience_prefers_the_number_with_a_year_unit(self):
+        self.assertEqual(scan_message("I started in 2015 and have 8 yrs now").experience, "8")
+        self.assertTrue(scan_message("I'm a fresher").fresher)
+
+    def test_confirmation_and_answers(self):
+        self.assertIs(scan_message("yes, go ahead").confirmation, True)
+        self.assertIs(scan_message("not now").confirmation, False)
+        self.assertEqual(scan_message("the answer is b)").mcq_answer, "B")
+        self.assertTrue(scan_message("ok bye").exit)
+
+    def test_name_forms(self):
+        self.assertEqual(scan_message("Sam Okoro here").name, "Sam Okoro")
+        self.assertEqual(scan_message("John Smith, nice to meet you").name, "John Smith")
+        self.assertIsNone(scan_message("jane@x.com").name)
+
+class ScanIntakeTest(unittest.TestCase):
+    def test_request_example(self):
+        self.assertEqual(scan_intake("I'm Jane Doe, jane@x.com, +1 555 123 4567, 5 years, Berlin, data engineer"), {
+            "name": "Jane Doe", "email": "jane@x.com", "phone": "+1 555 123 4567",
+            "experience": "5", "location": "Berlin", "position": "data engineer",
+        })
+
+    def test_labelled_fields(self):
+        found = scan_intake("Hello! I'm Priya Nair, priya.nair@example.org, +44 20 7946 0958, 3 years, "
+                            "based in Manchester, applying for the Data Analyst role")
+        self.assertEqual(found["name"], "Priya Nair")
+        self.assertEqual(found["location"], "Manchester")
+        self.assertEqual(found["position"], "Data Analyst role")
+
+    def test_bare_name_then_two_segment_place(self):
+        found = scan_intake("Jane Doe, jane@x.com, 5 years, Toronto, Canada, backend developer")
+        self.assertEqual(found["name"], "Jane Doe")
+        self.assertEqual(found["location"], "Toronto, Canada")
+
+    def test_seniority_words_mark_a_role(self):
+        self.assertEqual(scan_intake("Tech Lead, Berlin"), {"position": "Tech Lead"})
+        self.assertEqual(scan_intake("jane@x.com, Data Intern")["position"], "Data Intern")
+
+    def test_unlabelled_place_needs_the_name_first(self):
+        self.assertEqual(scan_intake("jane@x.com, Berlin"), {"email": "jane@x.com"})
+        missing = [field for field in INTAKE_FIELDS if field != "name"]
+        self.assertEqual(scan_intake("jane@x.com, Berlin", missing), {"email": "jane@x.com", "location": "Berlin"})
+
+    def test_location_when_asked_for(self):
+        self.assertEqual(scan_intake("Paris, France, 3 years", ["location", "position", "experience"]),
+                         {"location": "Paris, France", "experience": "3"})
+
+    def test_pleasantries_and_confirmations_are_not_values(self):
+        self.assertEqual(scan_intake("John Smith, nice to meet you"), {"name": "John Smith"})
+        self.assertEqual(scan_intake("hi, yes, jane@x.com", ["email", "location"]), {"email": "jane@x.com"})
+        self.assertEqual(scan_intake("thanks, sure", ["location", "position"]), {})
+
+    def test_only_missing_fields_are_returned(self):
+        found = scan_intake("I'm Jane Doe, jane@x.com, +1 555 123 4567", ["phone"])
+        self.assertEqual(found, {"phone": "+1 555 123 4567"})
+
+if __name__ == "__main__":
+    unittest.main()
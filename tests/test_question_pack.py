@@ -0,0 +1,126 @@
+"""Round trips of questions through write_pack and QuestionPack
+
+Run with:
+    python -m pytest tests
+"""
+import os
+import struct
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.update(LLM_BACKEND="stub", CANDIDATE_DB="", QUESTION_BANK_DB="", QUESTION_PACK="", QUESTION_WARMUP="0")
+
+from question_pack import HEADER, QuestionPack, write_pack
+
+def make_questions(prefix, count):
+    return [{"question": f"{prefix} question {i}?", "options": [f"{prefix} {i}{letter}" for letter in "wxyz"],
+             "correct_answer": "ABCD"[i % 4], "difficulty": i % 5 + 1} for i in range(count)]
+
+# Roles sharing a prefix, in an order that differs from the sorted one
+BANKS = {
+    "Data Engineer": make_questions("engineer", 12),
+    "Data": make_questions("data", 3),
+    "Data Engineering Manager": make_questions("manager", 5),
+    "Backend Developer": make_questions("backend", 20),
+    "Dat": make_questions("dat", 1),
+}
+UNICODE = {
+    "question": "Qu'est-ce que « naïve » signifie en 日本語? 🐍",
+    "options": ["素朴", "Zoë's café", "Ελληνικά", "emoji 🚀 option"],
+    "correct_answer": None,
+}
+
+class QuestionPackTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "pack.bin")
+
+    def open_pack(self, banks):
+        pack_id = write_pack(banks, self.path)
+        pack = QuestionPack(self.path)
+        self.addCleanup(pack.close)
+        self.assertEqual(pack.pack_id, pack_id)
+        return pack
+
+    def role_questions(self, pack, position):
+        first, count = pack.find_role(position)
+        return [pack.question(question_id) for question_id in range(first, first + count)]
+
+    def test_write_then_read(self):
+        pack = self.open_pack(BANKS)
+        self.assertEqual(pack.role_count, len(BANKS))
+        self.assertEqual(pack.question_count, sum(len(questions) for questions in BANKS.values()))
+        self.assertEqual(list(pack.roles()), sorted(role.lower() for role in BANKS))
+        for role, questions in BANKS.items():
+            with self.subTest(role=role):
+                self.assertEqual(self.role_questions(pack, role), questions)
+
+    def test_roles_sharing_a_prefix(self):
+        pack = self.open_pack(BANKS)
+        self.assertEqual(pack.find_role("data")[1], 3)
+        self.assertEqual(pack.find_role("Dat")[1], 1)
+        self.assertEqual(pack.find_role("  DATA engineer ")[1], 12)
+        self.assertEqual(pack.find_role("data engineering manager")[1], 5)
+        for missing in ("Da", "Data Engineering", "Data Engineers", "Zookeeper", "", "AAA"):
+            with self.subTest(position=missing):
+                self.assertIsNone(pack.find_role(missing))
+
+    def test_unicode_text(self):
+        pack = self.open_pack({"Data": make_questions("data", 2) + [UNICODE], "Python Developer": [UNICODE]})
+        self.assertEqual(self.role_questions(pack, "Data")[-1], UNICODE)
+        self.assertEqual(self.role_questions(pack, "python developer"), [UNICODE])
+
+    def test_unpackable_questions_are_skipped(self):
+        five_options = dict(UNICODE, options=UNICODE["options"] + ["extra"])
+        too_long = dict(UNICODE, question="x" * 0x10000)
+        pack = self.open_pack({"Data": [five_options, UNICODE, too_long]})
+        self.assertEqual(self.role_questions(pack, "Data"), [UNICODE])
+
+    def test_draw_counts(self):
+        pack = self.open_pack(BANKS)
+        first, total = pack.find_role("Backend Developer")
+        for count in (0, 1, 15, 20, 50):
+            with self.subTest(count=count):
+                drawn = pack.draw("Backend Developer", count)
+                self.assertEqual(len(drawn), min(count, total))
+                self.assertEqual(len(set(drawn)), len(drawn))
+                self.assertTrue(all(first <= question_id < first + total for question_id in drawn))
+        self.assertEqual(pack.draw("Zookeeper", 5), [])
+        self.assertEqual(len(pack.draw("Dat", 15)), 1)
+
+    def test_question_ids_outside_the_pack(self):
+        pack = self.open_pack(BANKS)
+        for question_id in (-1, pack.question_count):
+            with self.assertRaises(IndexError):
+                pack.question(question_id)
+
+    def test_pack_id_follows_the_content(self):
+        first = write_pack(BANKS, self.path)
+        self.assertEqual(write_pack(dict(reversed(list(BANKS.items()))), self.path), first)
+        self.assertNotEqual(write_pack(dict(BANKS, Data=make_questions("data", 4)), self.path), first)
+
+    def test_rejects_other_files(self):
+        write_pack(BANKS, self.path)
+        with open(self.path, "r+b") as f:
+            f.write(b"NOPE")
+        with self.assertRaisesRegex(ValueError, "not a question pack"):
+            QuestionPack(self.path)
+
+        write_pack(BANKS, self.path)
+        with open(self.path, "r+b") as f:
+            f.seek(4)
+            f.write(struct.pack("<H", 2))
+        with self.assertRaisesRegex(ValueError, "version 2"):
+            QuestionPack(self.path)
+
+        with open(self.path, "wb") as f:
+            f.write(b"TSQP" + bytes(HEADER.size - 10))
+        with self.assertRaisesRegex(ValueError, "too short"):
+            QuestionPack(self.path)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+"""iter_mcqs and iter_json_items fed the recorded LLM outputs in chunks of every size
+
+Run with:
+    python -m pytest tests
+"""
+import json
+import os
+import sys
+import unittest
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.update(LLM_BACKEND="stub", CANDIDATE_DB="", QUESTION_BANK_DB="", QUESTION_PACK="", QUESTION_WARMUP="0")
+
+import questions
+from prompts import iter_json_items
+from questions import iter_mcqs
+
+FIXTURES = os.path.join(ROOT, "benchmarks", "fixtures", "llm_outputs")
+CHUNK_SIZES = [1, 2, 3, 5, 7, 16, 64, 1000]
+
+def read_fixture(name):
+    # newline="" keeps the CRLF fixture's line endings as the model sent them
+    with open(os.path.join(FIXTURES, name), encoding="utf-8", newline="") as f:
+        return f.read()
+
+def fixtures(extension):
+    return sorted(name for name in os.listdir(FIXTURES) if name.endswith(extension))
+
+def chunked(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+def question(text, options):
+    return {"question": text, "options": options, "correct_answer": None}
+
+class IterMcqsTest(unittest.TestCase):
+    def test_chunking_does_not_change_the_result(self):
+        for name in fixtures(".txt"):
+            text = read_fixture(name)
+            whole = list(iter_mcqs([text]))
+            for size in CHUNK_SIZES:
+                with self.subTest(fixture=name, chunk_size=size):
+                    self.assertEqual(list(iter_mcqs(chunked(text, size))), whole)
+
+    def test_recorded_outputs(self):
+        numbered = list(iter_mcqs(chunked(read_fixture("numbered.txt"), 7)))
+        self.assertEqual(len(numbered), 15)
+        self.assertTrue(all(len(q["options"]) == 4 for q in numbered))
+        self.assertEqual([len(q["options"]) for q in iter_mcqs([read_fixture("short_options.txt")])], [3, 4, 2, 4])
+
+    def test_crlf_line_endings_are_stripped(self):
+        text = read_fixture("crlf_preamble.txt")
+        self.assertIn("\r\n", text)
+        parsed = list(iter_mcqs(chunked(text, 1)))
+        self.assertEqual(len(parsed), 5)
+        for q in parsed:
+            self.assertNotIn("\r", q["question"] + "".join(q["options"]))
+
+    def test_options_are_capped_at_four(self):
+        text = "1. Pick one\nA) a\nB) b\nC) c\nD) d\nA) again\nB) again\n2. Next\nA) w\nB) x\nC) y\nD) z\n"
+        self.assertEqual(list(iter_mcqs(chunked(text, 4))), [
+            question("Pick one", ["a", "b", "c", "d"]),
+            question("Next", ["w", "x", "y", "z"]),
+        ])
+
+    def test_question_is_yielded_once_its_last_option_arrives(self):
+        parsed = iter_mcqs(iter(["1. First?\nA) a\nB) b\nC) c\nD) d", "\n2. Second?\nA) w"]))
+        self.assertEqual(next(parsed), question("First?", ["a", "b", "c", "d"]))
+        self.assertEqual(list(parsed), [question("Second?", ["w"])])
+
+    def test_truncated_last_item(self):
+        text = read_fixture("numbered.txt")
+        cut = text[:text.index("C)", text.index("15."))]
+        parsed = list(iter_mcqs(chunked(cut, 5)))
+        self.assertEqual(len(parsed), 15)
+        self.assertEqual(parsed[:14], list(iter_mcqs([text]))[:14])
+        self.assertLess(len(parsed[-1]["options"]), 4)
+
+    def test_counted_when_closed_early(self):
+        with mock.patch.object(questions, "increment") as increment:
+            parsed = iter_mcqs(chunked(read_fixture("numbered.txt"), 16))
+            next(parsed)
+            next(parsed)
+            increment.assert_not_called()
+            parsed.close()
+        increment.assert_any_call("questions_parsed_total", 2, format="text")
+        increment.assert_any_call("questions_dropped_total", 0, format="text")
+
+class IterJsonItemsTest(unittest.TestCase):
+    def test_chunking_does_not_change_the_result(self):
+        for name in fixtures(".json"):
+            text = read_fixture(name)
+            items = json.loads(text)
+            if isinstance(items, dict):
+                items = items["questions"]
+            for size in CHUNK_SIZES:
+                with self.subTest(fixture=name, chunk_size=size):
+                    self.assertEqual(list(iter_json_items(chunked(text, size))), items)
+
+    def test_bare_and_wrapped_arrays(self):
+        for text in ('[{"a": [1, 2]}, 3, "x]"]', '{"questions": [{"a": [1, 2]}, 3, "x]"]}'):
+            with self.subTest(text=text):
+                self.assertEqual(list(iter_json_items(chunked(text, 1))), [{"a": [1, 2]}, 3, "x]"])
+        self.assertEqual(list(iter_json_items(["[", " ]"])), [])
+
+    def test_item_is_yielded_once_complete(self):
+        items = iter_json_items(iter(['[{"a": 1}, {"b"', ': 2}]']))
+        self.assertEqual(next(items), {"a": 1})
+        self.assertEqual(next(items), {"b": 2})
+        self.assertEqual(list(items), [])
+
+    def test_truncated_last_item(self):
+        text = read_fixture("structured.json")
+        cut = text[:text.rindex('"question"') + 30]
+        items = iter_json_items(chunked(cut, 64))
+        received = []
+        with self.assertRaises(ValueError):
+            for item in items:
+                received.append(item)
+        self.assertEqual(received, json.loads(text)[:-1])
+
+    def test_no_array(self):
+        with self.assertRaises(ValueError):
+            list(iter_json_items(chunked("Sorry, I can't help with that.", 4)))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,200 @@
+"""Round trips of conversation state through RedisSessionBackend and the stand-in server
+
+Run with:
+    python -m pytest tests
+"""
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.update(LLM_BACKEND="stub", CANDIDATE_DB="", QUESTION_BANK_DB="", QUESTION_PACK="", QUESTION_WARMUP="0")
+
+import question_pack
+from engine import ConversationEngine, STATE_LISTS
+from question_pack import QuestionPack, write_pack
+from resp_server import RespServer
+from session_store import RedisError, RedisSessionBackend, RespConnection, SessionStore
+
+INTAKE = ["hi", "My name is Alex Morgan", "alex.morgan@example.com"]
+SCREENING = INTAKE + ["+1 (555) 010-2233", "5", "Austin, Texas", "Data Engineer", "yes"]
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class RedisSessionStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.server = RespServer(clock=self.clock).start()
+        self.backend = RedisSessionBackend(self.server.url, ttl=100)
+        self.store = SessionStore(self.backend)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def engine_after(self, messages):
+        engine = ConversationEngine(adaptive=False)
+        for message in messages:
+            engine.step(message)
+        return engine
+
+    def load_elsewhere(self, session_id):
+        """Load through a store with no dirty-tracking history, as another replica would"""
+        return SessionStore(RedisSessionBackend(self.server.url, ttl=100)).load(session_id)
+
+    def test_save_and_load(self):
+        engine = self.engine_after(INTAKE)
+        self.store.save(engine)
+        loaded = self.load_elsewhere(engine.session_id)
+        self.assertEqual(loaded.to_state(), engine.to_state())
+
+    def test_partial_save_writes_only_changes(self):
+        engine = self.engine_after(INTAKE)
+        full = self.store.save(engine)
+        before = len(engine.messages)
+        del self.server.commands[:]
+        engine.step("+1 (555) 010-2233")
+        written = self.store.save(engine)
+        self.assertLess(written, full)
+        self.assertNotIn("DEL", self.server.commands)
+        self.assertEqual(self.store.save(engine), 0)
+
+        loaded = self.load_elsewhere(engine.session_id)
+        self.assertEqual(loaded.to_state(), engine.to_state())
+        self.assertGreater(len(loaded.messages), before)
+
+    def test_shrunk_list_is_rewritten(self):
+        engine = self.engine_after(INTAKE)
+        self.store.save(engine)
+        engine.messages = engine.messages[:2] + [{"role": "user", "content": "replaced"}]
+        self.store.save(engine)
+        loaded = self.load_elsewhere(engine.session_id)
+        self.assertEqual(loaded.messages, engine.messages)
+
+    def test_loaded_session_saves_incrementally(self):
+        engine = self.engine_after(INTAKE)
+        self.store.save(engine)
+        store = SessionStore(self.backend)
+        loaded = store.load(engine.session_id)
+        loaded.step("+1 (555) 010-2233")
+        self.assertLess(store.save(loaded), len(loaded.messages))
+        self.assertEqual(self.load_elsewhere(engine.session_id).to_state(), loaded.to_state())
+
+    def test_unchanged_lists_expire_with_the_session(self):
+        engine = self.engine_after(INTAKE)
+        self.store.save(engine)
+        key = self.backend.prefix + engine.session_id
+        self.clock.now += 60
+        engine.collected_info = dict(engine.collected_info, location="Austin, Texas")
+        self.assertEqual(self.store.save(engine), 1)
+        for list_key in [f"{key}:{name}" for name in STATE_LISTS if getattr(engine, name)]:
+            self.assertEqual(self.server.ttl(list_key), 100, list_key)
+
+        self.clock.now += 60
+        loaded = self.load_elsewhere(engine.session_id)
+        self.assertEqual(loaded.messages, engine.messages)
+
+        self.clock.now += 100
+        self.assertIsNone(self.load_elsewhere(engine.session_id))
+
+    def test_unknown_and_deleted_sessions(self):
+        self.assertIsNone(self.store.load("missing"))
+        engine = self.engine_after(INTAKE)
+        self.store.save(engine)
+        self.store.delete(engine.session_id)
+        self.assertIsNone(self.load_elsewhere(engine.session_id))
+        self.assertEqual(self.server.data, {})
+
+class RestoredAssessmentTest(unittest.TestCase):
+    """A session moved to another replica mid-assessment never repeats a question"""
+
+    def setUp(self):
+        self.server = RespServer().start()
+        self.store = SessionStore(RedisSessionBackend(self.server.url))
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "pack.bin")
+        questions = [{"question": f"Data question {i}?", "options": ["w", "x", "y", "z"], "correct_answer": "A"}
+                     for i in range(40)]
+        write_pack({"Data Engineer": questions}, path)
+        pack = QuestionPack(path)
+        self.addCleanup(pack.close)
+        for name, value in (("_question_pack", pack), ("_question_pack_loaded", True)):
+            patcher = mock.patch.object(question_pack, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def asked_texts(self, engine):
+        return [engine.question(index)["question"] for index in range(len(engine.mcq_questions))]
+
+    def finish_elsewhere(self, engine, state_change=None):
+        for _ in range(4):
+            engine.step("A")
+        self.store.save(engine)
+        if state_change:
+            stored = self.store.backend.load(engine.session_id)
+            self.store.backend.save(engine.session_id, state_change(stored[0]), {})
+        loaded = SessionStore(RedisSessionBackend(self.server.url)).load(engine.session_id)
+        while not loaded.assessment_complete:
+            loaded.step("A")
+        return loaded
+
+    def test_finished_draw_resumes_its_sequence(self):
+        engine = ConversationEngine(adaptive=False)
+        for message in SCREENING:
+            engine.step(message)
+        drawn = [question_pack.resolve_question(q)["question"] for q in engine.question_job.questions]
+        loaded = self.finish_elsewhere(engine)
+        self.assertEqual(self.asked_texts(loaded), drawn)
+
+    def test_new_draw_skips_questions_already_asked(self):
+        engine = ConversationEngine(adaptive=False)
+        for message in SCREENING:
+            engine.step(message)
+        # As saved before finished jobs were persisted: the restored session has to draw again
+        loaded = self.finish_elsewhere(engine, lambda fields: {"job_questions": "null"})
+        asked = self.asked_texts(loaded)
+        self.assertGreater(len(asked), 5)
+        self.assertEqual(len(asked), len(set(asked)))
+
+    def test_adaptive_pool_survives_the_move(self):
+        engine = ConversationEngine(adaptive=True)
+        for message in SCREENING:
+            engine.step(message)
+        loaded = self.finish_elsewhere(engine)
+        asked = self.asked_texts(loaded)
+        self.assertEqual(len(asked), len(set(asked)))
+
+class RespConnectionTest(unittest.TestCase):
+    def setUp(self):
+        self.server = RespServer(password="secret").start()
+        self.connection = RespConnection(self.server.url)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_replies(self):
+        replies = self.connection.execute(
+            ("PING",), ("HSET", "h", "name", "Zoë\r\nMorgan", "empty", ""), ("HGETALL", "h"),
+            ("LRANGE", "missing", 0, -1), ("EXPIRE", "missing", 10),
+        )
+        self.assertEqual(replies, ["PONG", 2, ["name", "Zoë\r\nMorgan", "empty", ""], [], 0])
+        self.assertEqual(self.server.commands[:2], ["AUTH", "SELECT"])
+
+    def test_error_reply_raises(self):
+        with self.assertRaises(RedisError) as raised:
+            self.connection.execute(("NOSUCHCOMMAND",))
+        self.assertIn("unknown command", str(raised.exception))
+
+if __name__ == "__main__":
+    unittest.main()
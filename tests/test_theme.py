@@ -0,0 +1,42 @@
+"""minify_css keeps the cascade of the stylesheet it minifies
+
+Run with:
+    python -m pytest tests
+"""
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from theme import THEME_SOURCE, minify_css, parse_css
+
+class MinifyCssTest(unittest.TestCase):
+    def test_rules_are_not_moved_past_other_rules(self):
+        css = ".a { color: red }\n.b { color: blue }\n.a { margin: 0 }"
+        self.assertEqual(minify_css(css), ".a{color:red}.b{color:blue}.a{margin:0}")
+
+    def test_adjacent_repeats_are_merged(self):
+        self.assertEqual(minify_css(".a{color:red} .a{margin:0; color:blue}"), ".a{color:red;margin:0;color:blue}")
+        self.assertEqual(minify_css("@media x{.a{b:c}} @media x{.d{e:f}}"), "@media x{.a{b:c}.d{e:f}}")
+        self.assertEqual(minify_css("@media x{@media x{.a{b:c}}}"), "@media x{.a{b:c}}")
+        self.assertEqual(minify_css("@keyframes k{0%{a:b}} @keyframes k{0%{a:c}}"), "@keyframes k{0%{a:c}}")
+
+    def test_fallback_declarations_are_kept(self):
+        self.assertEqual(minify_css(".a { display: -webkit-box; display: flex; color: red; color: red }"),
+                         ".a{display:-webkit-box;display:flex;color:red}")
+        self.assertEqual(minify_css(".a{color:red!important} .a{color:blue}"), ".a{color:red!important;color:blue}")
+
+    def test_whitespace_and_comments(self):
+        css = "/* note */\ndiv.stButton  >  button ,\n.x  { font-family : Arial , sans-serif ; }\n.empty { }"
+        self.assertEqual(minify_css(css), "div.stButton>button,.x{font-family:Arial,sans-serif}")
+
+    def test_minified_theme_parses_to_the_same_rules(self):
+        with open(THEME_SOURCE, encoding="utf-8") as f:
+            css = minify_css(f.read())
+        self.assertEqual(minify_css(css), css)
+        self.assertTrue(parse_css(css))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,189 @@
+"""Build the app theme into a deduplicated, minified, content-versioned stylesheet.
+
+Usage:
+    python theme.py [--source assets/theme.css] [--output-dir assets/dist]
+
+Writes theme.<hash>.min.css plus a manifest.json naming it. The app loads the
+built file once per process via load_theme() and falls back to building in
+memory when the manifest is missing or older than the source.
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+from functools import lru_cache
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+THEME_SOURCE = os.getenv("THEME_SOURCE", os.path.join(BASE_DIR, "assets", "theme.css"))
+THEME_DIST_DIR = os.getenv("THEME_DIST_DIR", os.path.join(BASE_DIR, "assets", "dist"))
+MANIFEST_NAME = "manifest.json"
+
+COMMENT_PATTERN = re.compile(r"/\*.*?\*/", re.DOTALL)
+WHITESPACE_PATTERN = re.compile(r"\s+")
+SELECTOR_COMBINATOR_PATTERN = re.compile(r"\s*([>+~,])\s*")
+VALUE_COMMA_PATTERN = re.compile(r"\s*,\s*")
+IMPORTANT_PATTERN = re.compile(r"\s*!\s*important$", re.IGNORECASE)
+
+class Rule:
+    """A selector with its declarations, in source order"""
+
+    def __init__(self, selector, declarations):
+        self.selector = selector
+        self.declarations = declarations
+
+class AtRule:
+    """An at-rule block such as @media or @keyframes and the nodes inside it"""
+
+    def __init__(self, prelude, children):
+        self.prelude = prelude
+        self.children = children
+
+def _squeeze(text):
+    return WHITESPACE_PATTERN.sub(" ", text).strip()
+
+def _parse_declarations(body):
+    declarations = []
+    for declaration in body.split(";"):
+        name, sep, value = declaration.partition(":")
+        if not sep or not name.strip():
+            continue
+        value = _squeeze(value)
+        important = bool(IMPORTANT_PATTERN.search(value))
+        value = VALUE_COMMA_PATTERN.sub(",", IMPORTANT_PATTERN.sub("", value))
+        declarations.append((name.strip().lower(), value, important))
+    return _drop_repeats(declarations)
+
+def _drop_repeats(declarations):
+    # Only a declaration repeated verbatim later is redundant; a repeated property with
+    # another value may be a fallback such as display:-webkit-box;display:flex
+    seen = set()
+    kept = []
+    for declaration in reversed(declarations):
+        if declaration not in seen:
+            seen.add(declaration)
+            kept.append(declaration)
+    kept.reverse()
+    return kept
+
+def parse_css(text, pos=0):
+    """Parse a stylesheet into a list of Rule and AtRule nodes"""
+    nodes, _ = _parse_block(COMMENT_PATTERN.sub("", text), pos)
+    return nodes
+
+def _parse_block(text, pos):
+    nodes = []
+    while pos < len(text):
+        brace = text.find("{", pos)
+        close = text.find("}", pos)
+        if close != -1 and (brace == -1 or close < brace):
+            return nodes, close + 1
+        if brace == -1:
+            break
+        prelude = _squeeze(text[pos:brace])
+        if prelude.startswith("@"):
+            children, pos = _parse_block(text, brace + 1)
+            nodes.append(AtRule(prelude, children))
+        else:
+            end = text.find("}", brace)
+            end = len(text) if end == -1 else end
+            selector = ",".join(_squeeze(part) for part in prelude.split(","))
+            nodes.append(Rule(SELECTOR_COMBINATOR_PATTERN.sub(r"\1", selector), _parse_declarations(text[brace + 1:end])))
+            pos = end + 1
+    return nodes, len(text)
+
+def dedupe(nodes, context=None):
+    """Merge adjacent repeats of a selector or at-rule within each block
+
+    A block nested in an at-rule with the same prelude is unwrapped into its parent.
+    Only adjacent repeats are merged, as moving a rule past another one can change
+    which of them wins, and of two adjacent @keyframes with one name the later is kept.
+    """
+    flat = []
+    for node in nodes:
+        if isinstance(node, AtRule) and node.prelude == context:
+            flat.extend(node.children)
+        else:
+            flat.append(node)
+
+    merged = []
+    for node in flat:
+        previous = merged[-1] if merged else None
+        if isinstance(node, Rule) and isinstance(previous, Rule) and node.selector == previous.selector:
+            merged[-1] = Rule(node.selector, _drop_repeats(previous.declarations + node.declarations))
+        elif isinstance(node, AtRule) and isinstance(previous, AtRule) and node.prelude == previous.prelude:
+            if not node.prelude.startswith("@keyframes"):
+                node = AtRule(node.prelude, previous.children + node.children)
+            merged[-1] = node
+        else:
+            merged.append(node)
+    merged = [AtRule(node.prelude, dedupe(node.children, node.prelude)) if isinstance(node, AtRule) else node
+              for node in merged]
+    return [node for node in merged if (node.declarations if isinstance(node, Rule) else node.children)]
+
+def serialize(nodes):
+    out = []
+    for node in nodes:
+        if isinstance(node, AtRule):
+            out.append(f"{node.prelude}{{{serialize(node.children)}}}")
+        else:
+            body = ";".join(f"{name}:{value}{'!important' if important else ''}"
+                            for name, value, important in node.declarations)
+            out.append(f"{node.selector}{{{body}}}")
+    return "".join(out)
+
+def minify_css(text):
+    """Return `text` with adjacent duplicate rules merged, comments dropped and whitespace removed"""
+    return serialize(dedupe(parse_css(text)))
+
+def theme_version(css):
+    return hashlib.sha256(css.encode("utf-8")).hexdigest()[:10]
+
+def build_theme(source=THEME_SOURCE, output_dir=THEME_DIST_DIR):
+    """Write the minified theme and its manifest, returning the built file's path"""
+    with open(source, encoding="utf-8") as f:
+        css = minify_css(f.read())
+    filename = f"theme.{theme_version(css)}.min.css"
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, filename)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(css)
+    with open(os.path.join(output_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump({"theme": filename}, f)
+    return path
+
+def _built_theme_path(source, output_dir):
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME), encoding="utf-8") as f:
+            path = os.path.join(output_dir, json.load(f)["theme"])
+        if os.path.getmtime(path) >= os.path.getmtime(source):
+            return path
+    except (OSError, ValueError, KeyError):
+        pass
+    return None
+
+@lru_cache(maxsize=None)
+def load_theme(source=THEME_SOURCE, output_dir=THEME_DIST_DIR):
+    """Return the minified theme CSS, read once per process"""
+    path = _built_theme_path(source, output_dir)
+    if path is None:
+        with open(source, encoding="utf-8") as f:
+            return minify_css(f.read())
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the minified, versioned app theme.")
+    parser.add_argument("--source", default=THEME_SOURCE, help="theme source stylesheet")
+    parser.add_argument("--output-dir", default=THEME_DIST_DIR, help="directory for the built theme")
+    args = parser.parse_args(argv)
+
+    with open(args.source, encoding="utf-8") as f:
+        source_size = len(f.read().encode("utf-8"))
+    path = build_theme(args.source, args.output_dir)
+    print(f"{path}: {os.path.getsize(path)} bytes (source {source_size} bytes)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,14 @@
 import re
 
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+PHONE_PATTERN = re.compile(r'^\+?[0-9\s\-\(\)]{7,}$')
+MAX_EMAIL_LENGTH = 254
+MAX_PHONE_LENGTH = 32
+
 def validate_email(email):
     """Basic email validation"""
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(pattern, email) is not None
+    return len(email) <= MAX_EMAIL_LENGTH and EMAIL_PATTERN.match(email) is not None
 
 def validate_phone(phone):
     """Basic phone number validation (international format)"""
-    pattern = r'^\+?[0-9\s\-\(\)]{7,}$'
-    return re.match(pattern, phone) is not None
\ No newline at end of file
+    return len(phone) <= MAX_PHONE_LENGTH and PHONE_PATTERN.match(phone) is not None